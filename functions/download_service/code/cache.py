@@ -0,0 +1,53 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+
+T = TypeVar("T")
+
+
+class TtlCache(Generic[T]):
+    """Value cached in the process for ttl_seconds, refreshed with a single flight
+
+    Concurrent callers finding the value missing or expired share one in-flight load instead of
+    each running it, so a traffic spike costs one query per execution environment and TTL.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.value: T | None = None
+        self.expires_at = 0.0
+        self.loading: asyncio.Future[T] | None = None
+
+    def peek(self, stale_seconds: float = 0.0) -> T | None:
+        """Return the cached value if it's still fresh, or expired less than stale_seconds ago, without loading it"""
+        if self.value is not None and time.monotonic() < self.expires_at + stale_seconds:
+            return self.value
+        return None
+
+    async def get(self, load: Callable[[], Awaitable[T]]) -> T:
+        """Return the cached value, loading it when it's missing or expired"""
+
+        if (value := self.peek()) is not None:
+            return value
+
+        if self.loading is None:
+            self.loading = asyncio.ensure_future(self.__load(load))
+
+        # A cancelled caller doesn't cancel the load the other callers are waiting for
+        return await asyncio.shield(self.loading)
+
+    def clear(self) -> None:
+        """Drop the cached value, the next call loads it again"""
+        self.value = None
+        self.expires_at = 0.0
+
+    async def __load(self, load: Callable[[], Awaitable[T]]) -> T:
+        try:
+            value = await load()
+            self.value = value
+            self.expires_at = time.monotonic() + self.ttl_seconds
+            return value
+        finally:
+            self.loading = None
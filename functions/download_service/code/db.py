@@ -1,21 +1,162 @@
-from code.environment import DB_SECRET_NAME, SERVICE_NAME
-from collections.abc import AsyncGenerator
+import functools
+import time
+from code.aws import run_in_executor
+from code.environment import (
+    DB_APPLICATION_NAME,
+    DB_DRIVER_PRESET,
+    DB_JIT_ENABLED,
+    DB_POOL_MAX_OVERFLOW,
+    DB_POOL_MODE,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_READER_HOST,
+    DB_SECRET_MAX_AGE_SECONDS,
+    DB_SECRET_NAME,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_STATEMENT_TIMEOUT_MS,
+    SERVICE_NAME,
+    SLOW_QUERY_THRESHOLD_MS,
+)
+from code.timing import QUERIES, current_timings, record
+from collections.abc import AsyncGenerator, Awaitable, Callable
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, ParamSpec, TypeVar
+from uuid import uuid4
 
+import asyncpg
 from aws_lambda_powertools import Logger, Tracer
-from aws_lambda_powertools.utilities.parameters import GetParameterError, get_secret
+from sqlalchemy import Engine, event
+from sqlalchemy.dialects.postgresql.asyncpg import PGDialect_asyncpg
 from sqlalchemy.engine.url import URL
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
 from sqlalchemy.pool import NullPool
 
 
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
 tracer = Tracer(service=SERVICE_NAME)
 logger = Logger(service=SERVICE_NAME)
 
-try:
-    secret_data = get_secret(name=DB_SECRET_NAME, transform="json")
-    db_secret = {
+# Must match the service name in docker-compose.yml
+LOCAL_DB_SECRET = {
+    "drivername": "postgresql+asyncpg",
+    "database": "postgres",
+    "username": "postgres",
+    "password": "postgres",
+    "host": "postgres-db",
+    "port": 5432,
+}
+
+
+@dataclass(frozen=True)
+class DriverOptions:
+    """Options of the asyncpg connections and of their Postgres sessions
+
+    * statement_cache_size: prepared statements cached per connection, 0 prepares every statement again
+    * unique_statement_names: name the prepared statements uniquely, so they can't collide on a server
+      connection shared through a proxy
+    * startup_settings: send statement_timeout and jit when connecting. Transaction-mode proxies reject
+      or drop them, so behind a proxy they're set on the database role instead
+    * application_name: shown in pg_stat_activity and the Postgres logs
+    * statement_timeout_ms: cancel the statements running longer, 0 disables the timeout
+    * jit: JIT-compile the expensive queries, which costs more than it saves on small OLTP statements
+    """
+
+    statement_cache_size: int
+    unique_statement_names: bool
+    startup_settings: bool
+    application_name: str
+    statement_timeout_ms: int
+    jit: bool
+
+    def server_settings(self) -> dict[str, str]:
+        """Build the Postgres settings sent when connecting"""
+
+        settings = {"application_name": self.application_name}
+        if self.startup_settings:
+            settings["statement_timeout"] = str(self.statement_timeout_ms)
+            settings["jit"] = "on" if self.jit else "off"
+        return settings
+
+
+DRIVER_PRESETS: dict[str, dict[str, Any]] = {
+    # The process holds its connections, so the prepared statements are reused across requests
+    "direct": {"statement_cache_size": 100, "unique_statement_names": False, "startup_settings": True},
+    # Each transaction may run on another server connection, where the cached statements don't exist
+    "proxy": {"statement_cache_size": 0, "unique_statement_names": True, "startup_settings": False},
+}
+
+
+def get_driver_options() -> DriverOptions:
+    """Build the driver options from the DB_DRIVER_PRESET preset, which DB_STATEMENT_CACHE_SIZE overrides.
+
+    * direct: connections straight to Aurora, kept by the pool.
+    * proxy: connections through a transaction-mode proxy, e.g. PgBouncer or RDS Proxy.
+    """
+
+    if DB_DRIVER_PRESET not in DRIVER_PRESETS:
+        msg = f"Invalid DB_DRIVER_PRESET: {DB_DRIVER_PRESET}. Expected one of {', '.join(DRIVER_PRESETS)}."
+        raise ValueError(msg)
+
+    preset = DRIVER_PRESETS[DB_DRIVER_PRESET]
+    if DB_STATEMENT_CACHE_SIZE is not None:
+        preset = {**preset, "statement_cache_size": int(DB_STATEMENT_CACHE_SIZE)}
+
+    return DriverOptions(
+        **preset,
+        application_name=DB_APPLICATION_NAME,
+        statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS,
+        jit=DB_JIT_ENABLED,
+    )
+
+
+driver_options = get_driver_options()
+
+# Set once Secrets Manager is found unreachable, so local runs don't retry it on every connection
+is_local_db = False
+
+
+def get_db_secret(force_fetch: bool = False) -> dict[str, Any]:
+    """Get the DB credentials from Secrets Manager, cached for DB_SECRET_MAX_AGE_SECONDS.
+
+    Falls back to the local docker-compose database when Secrets Manager can't be reached.
+
+    Args:
+    ----
+        force_fetch (bool): skip the cache, e.g. when the cached password was rotated
+
+    """
+
+    global is_local_db  # noqa: PLW0603
+
+    if is_local_db:
+        return dict(LOCAL_DB_SECRET)
+
+    # Imports boto3, so it's deferred to the first connection
+    from aws_lambda_powertools.utilities.parameters import GetParameterError, get_secret
+
+    try:
+        secret_data = get_secret(
+            name=DB_SECRET_NAME,
+            transform="json",
+            max_age=DB_SECRET_MAX_AGE_SECONDS,
+            force_fetch=force_fetch,
+        )
+    except GetParameterError:
+        logger.warning(
+            "Failed to retrieve from Secrets Manager. Using local db.",
+            secret_name=DB_SECRET_NAME,
+        )
+        is_local_db = True
+        return dict(LOCAL_DB_SECRET)
+
+    return {
         "drivername": "postgresql+asyncpg",
         "database": secret_data.get("dbname"),
         "username": secret_data.get("username"),
@@ -23,34 +164,208 @@ try:
         "host": secret_data.get("host"),
         "port": secret_data.get("port"),
     }
-    logger.info("Successfully retrieved DB credentials from Secrets Manager")
-except GetParameterError:
-    logger.warning(
-        "Failed to retrieve from Secrets Manager. Using local db.",
-        secret_name=DB_SECRET_NAME,
+
+
+async def connect(host: str | None = None) -> asyncpg.Connection:
+    """Open a connection with the current DB credentials.
+
+    The credentials are resolved on the first connection rather than at import time.
+    When the password was rotated since it was cached, it's fetched again and the connection retried once.
+
+    Args:
+    ----
+        host (str, optional): connect to this host instead of the one of the credentials, e.g. the reader endpoint
+
+    """
+
+    with record("db_connect"):
+        db_secret = await run_in_executor(get_db_secret)
+        try:
+            return await open_connection({**db_secret, "host": host or db_secret["host"]})
+        except asyncpg.InvalidPasswordError:
+            logger.warning("DB authentication failed, refreshing the credentials", secret_name=DB_SECRET_NAME)
+            db_secret = await run_in_executor(get_db_secret, force_fetch=True)
+            return await open_connection({**db_secret, "host": host or db_secret["host"]})
+
+
+async def connect_reader() -> asyncpg.Connection:
+    """Open a connection to the reader endpoint, or to the writer when no reader can be reached"""
+
+    try:
+        return await connect(host=DB_READER_HOST)
+    except (OSError, asyncpg.CannotConnectNowError):
+        logger.warning("DB reader unreachable, using the writer", host=DB_READER_HOST)
+        return await connect()
+
+
+async def open_connection(db_secret: dict[str, Any]) -> asyncpg.Connection:
+    """Open an asyncpg connection from the DB credentials"""
+    return await asyncpg.connect(
+        host=db_secret["host"],
+        port=db_secret["port"],
+        user=db_secret["username"],
+        password=db_secret["password"],
+        database=db_secret["database"],
+        statement_cache_size=driver_options.statement_cache_size,
+        server_settings=driver_options.server_settings(),
     )
-    db_secret = {
-        "drivername": "postgresql+asyncpg",
-        "database": "postgres",
-        "username": "postgres",
-        "password": "postgres",
-        "host": "postgres-db",  # Must match the service name in docker-compose.yml
-        "port": 5432,
+
+
+def get_pool_options() -> dict[str, Any]:
+    """Build the connection pool options for the engine.
+
+    * queue: keep a small bounded pool alive for the life of the execution environment,
+      so warm invocations reuse the connection instead of paying the TCP+TLS+auth handshake.
+    * null: open and close a connection per session. Use it when a connection proxy does the pooling.
+    """
+
+    if DB_POOL_MODE == "null":
+        return {"poolclass": NullPool}
+
+    if DB_POOL_MODE != "queue":
+        msg = f"Invalid DB_POOL_MODE: {DB_POOL_MODE}. Expected 'queue' or 'null'."
+        raise ValueError(msg)
+
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": True,
     }
 
-engine = create_async_engine(
-    url=URL.create(**db_secret),
-    poolclass=NullPool,
+
+# The DBAPI adapter of SQLAlchemy wrapping the asyncpg connections
+asyncpg_dbapi = PGDialect_asyncpg.import_dbapi()
+
+
+def build_engine(async_creator: Callable[[], Awaitable[asyncpg.Connection]]) -> AsyncEngine:
+    """Build a pooled engine opening its connections with async_creator
+
+    SQLAlchemy keeps its own cache of the asyncpg prepared statements, whose options it only takes
+    from a creator. So this does what the async_creator option of create_async_engine does, with them.
+    """
+
+    def creator() -> Any:
+        return asyncpg_dbapi.connect(
+            async_creator_fn=async_creator,
+            prepared_statement_cache_size=driver_options.statement_cache_size,
+            prepared_statement_name_func=(lambda: f"__asyncpg_{uuid4()}__") if driver_options.unique_statement_names else None,
+        )
+
+    return create_async_engine(
+        url=URL.create(drivername="postgresql+asyncpg"),
+        creator=creator,
+        **get_pool_options(),
+    )
+
+
+engine = build_engine(connect)
+
+# Serves the read-only repo methods, the writer does when the cluster has no reader
+reader_engine = build_engine(connect_reader) if DB_READER_HOST else engine
+
+
+def redact_parameters(parameters: Any, executemany: bool) -> Any:
+    """Replace the parameter values of a statement, which may hold emails, with their type names"""
+
+    if executemany:
+        return f"{len(parameters)} parameter sets"
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001, ARG001
+    """Start timing the statement"""
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001, ARG001
+    """Count the statement in the timings of the request and log it when slow
+
+    The asyncpg calls run in greenlets sharing the context of the calling task, so the statement
+    is counted in the request that ran it.
+    """
+
+    duration_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    if (timings := current_timings.get()) is not None:
+        timings.add(QUERIES, duration_ms)
+
+    if duration_ms >= SLOW_QUERY_THRESHOLD_MS:
+        logger.warning(
+            "Slow query",
+            statement=statement,
+            parameters=redact_parameters(parameters, executemany),
+            duration_ms=round(duration_ms, 1),
+        )
+
+
+def handle_error(exception_context) -> None:  # noqa: ANN001
+    """Stop timing the failed statement"""
+    if exception_context.connection is not None and exception_context.connection.info.get("query_start"):
+        exception_context.connection.info["query_start"].pop()
+
+
+def instrument(target: AsyncEngine) -> None:
+    """Time and count the statements run on an engine"""
+    event.listen(target.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(target.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(target.sync_engine, "handle_error", handle_error)
+
+
+instrument(engine)
+if reader_engine is not engine:
+    instrument(reader_engine)
+
+# Set while a read-only repo method runs
+reading: ContextVar[bool] = ContextVar("reading", default=False)
+
+
+def read_only(method: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+    """Run a repo method on the reader, for the queries which tolerate the replica lag. Example:
+
+    @tracer.capture_method(capture_response=False)
+    @read_only
+    async def get_statistics(self) -> DownloadStatistics:
+    """
+
+    @functools.wraps(method)
+    async def run_on_reader(*args: P.args, **kwargs: P.kwargs) -> T:
+        token = reading.set(True)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            reading.reset(token)
+
+    return run_on_reader
+
+
+class RoutingSession(Session):
+    """Session running the read-only repo methods on the reader, and everything else on the writer
+
+    Once a session used the writer it sticks to it, so it reads its own writes rather than a lagging replica.
+    """
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Engine:  # noqa: ARG002
+        """Pick the engine of the next statement"""
+
+        if reading.get() and not self.info.get("uses_writer"):
+            return reader_engine.sync_engine
+
+        self.info["uses_writer"] = True
+        return engine.sync_engine
+
+
+async_session = async_sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
 )
 
 
 async def get_session() -> AsyncGenerator[AsyncSession]:
     """Yield a Session instance"""
-    async_session = sessionmaker(
-        bind=engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
     async with async_session() as session:
         try:
             yield session
@@ -0,0 +1,61 @@
+import argparse
+import os
+import subprocess
+import sys
+
+
+IMPORT_TIME_BUDGET_MS = int(os.environ.get("IMPORT_TIME_BUDGET_MS", "1100"))
+
+
+def measure(module: str) -> list[tuple[str, int, int]]:
+    """Import a module in a fresh interpreter with `python -X importtime`
+
+    Returns
+    -------
+        list[tuple[str, int, int]]: the name, self and cumulative import time in microseconds of every imported module
+
+    """
+
+    # The first run compiles the bytecode, so it isn't part of the measurement
+    for _ in range(2):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],  # noqa: S603
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    return timings
+
+
+def check(module: str, budget_ms: int, top: int) -> bool:
+    """Print the slowest imports of a module and whether its import time fits the budget"""
+
+    timings = measure(module)
+    total_ms = next(cumulative_us for name, _, cumulative_us in timings if name == module) / 1000
+
+    print(f"Slowest {top} modules by self import time:")  # noqa: T201
+    for name, self_us, cumulative_us in sorted(timings, key=lambda timing: timing[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  {cumulative_us / 1000:8.1f} ms  {name}")  # noqa: T201
+
+    print(f"Importing {module} took {total_ms:.0f} ms, the budget is {budget_ms} ms")  # noqa: T201
+
+    return total_ms <= budget_ms
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import time of a module against a budget")
+    parser.add_argument("module", nargs="?", default="code.api_handler")
+    parser.add_argument("--budget-ms", type=int, default=IMPORT_TIME_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    if not check(args.module, args.budget_ms, args.top):
+        sys.exit(1)
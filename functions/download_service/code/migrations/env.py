@@ -1,6 +1,7 @@
 # ruff:noqa: ARG001
 import asyncio
-from code.db import db_secret
+import re
+from code.db import get_db_secret
 
 # All models must be imported here
 from code.models import *  # noqa: F403
@@ -17,6 +18,9 @@ from sqlmodel import SQLModel, text
 
 SCHEMA_NAME = "download"
 
+# The partitions of the downloads table are created and dropped by the sweeper, not by the models
+PARTITION_NAME = re.compile(r"^downloads_(p\d{4}_\d{2}|default)$")
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -51,7 +55,7 @@ def include_object(
         return True
         ```
     """
-    return True
+    return not (type == "table" and reflected and name is not None and PARTITION_NAME.match(name))
 
 
 def do_run_migrations(connection: Connection) -> None:
@@ -72,6 +76,7 @@ def do_run_migrations(connection: Connection) -> None:
 
 async def run_async_migrations() -> None:
     """Create an Engine and associate a connection with the context and run async migrations"""
+    db_secret = get_db_secret()
     try:
         engine = create_async_engine(
             url=URL.create(**db_secret),
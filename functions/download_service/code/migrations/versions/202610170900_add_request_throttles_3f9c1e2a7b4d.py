@@ -0,0 +1,44 @@
+"""add request throttles
+
+Revision ID: 3f9c1e2a7b4d
+Revises: 83367e99b9c5
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9c1e2a7b4d"
+down_revision: str | None = "83367e99b9c5"
+branch_labels: str | list[str] | None = None
+depends_on: str | list[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade to '3f9c1e2a7b4d'"""
+    op.create_table(
+        "request_throttles",
+        sa.Column("email", sqlmodel.String(), nullable=False),
+        sa.Column("requested_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("email"),
+        schema="download",
+    )
+
+    # Seed the throttle rows so the backoff window is enforced across the deploy
+    op.execute(
+        """
+        INSERT INTO download.request_throttles (email, requested_at)
+        SELECT email, max(created_at)
+        FROM download.downloads
+        GROUP BY email
+        """,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade to '83367e99b9c5'"""
+    op.drop_table("request_throttles", schema="download")
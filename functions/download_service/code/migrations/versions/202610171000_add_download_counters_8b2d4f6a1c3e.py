@@ -0,0 +1,99 @@
+"""add download counters
+
+Revision ID: 8b2d4f6a1c3e
+Revises: 3f9c1e2a7b4d
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2d4f6a1c3e"
+down_revision: str | None = "3f9c1e2a7b4d"
+branch_labels: str | list[str] | None = None
+depends_on: str | list[str] | None = None
+
+# Number of counter rows the increments are spread over
+COUNTER_SHARDS = 8
+
+
+def upgrade() -> None:
+    """Upgrade to '8b2d4f6a1c3e'"""
+    op.create_table(
+        "download_counters",
+        sa.Column("shard", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("requested", sa.BigInteger(), nullable=False),
+        sa.Column("downloaded", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("shard"),
+        schema="download",
+    )
+
+    # Statement level triggers with transition tables, so a multi-row insert or update
+    # increments a single random shard once with the number of affected rows
+    op.execute(
+        f"""
+        CREATE FUNCTION download.count_requested_downloads() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO download.download_counters AS counters (shard, requested, downloaded)
+            SELECT floor(random() * {COUNTER_SHARDS})::int, count(*), 0
+            FROM new_rows
+            HAVING count(*) > 0
+            ON CONFLICT (shard) DO UPDATE SET requested = counters.requested + excluded.requested;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,  # noqa: S608
+    )
+    op.execute(
+        f"""
+        CREATE FUNCTION download.count_downloaded_downloads() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO download.download_counters AS counters (shard, requested, downloaded)
+            SELECT floor(random() * {COUNTER_SHARDS})::int, 0, count(*)
+            FROM new_rows
+            JOIN old_rows ON old_rows.id = new_rows.id
+            WHERE new_rows.is_downloaded AND NOT old_rows.is_downloaded
+            HAVING count(*) > 0
+            ON CONFLICT (shard) DO UPDATE SET downloaded = counters.downloaded + excluded.downloaded;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,  # noqa: S608
+    )
+    op.execute(
+        """
+        CREATE TRIGGER count_requested_downloads
+        AFTER INSERT ON download.downloads
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION download.count_requested_downloads()
+        """,
+    )
+    op.execute(
+        """
+        CREATE TRIGGER count_downloaded_downloads
+        AFTER UPDATE ON download.downloads
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION download.count_downloaded_downloads()
+        """,
+    )
+
+    # Seed the counters with the current totals
+    op.execute(
+        """
+        INSERT INTO download.download_counters (shard, requested, downloaded)
+        SELECT 0, count(*), count(*) FILTER (WHERE is_downloaded)
+        FROM download.downloads
+        """,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade to '3f9c1e2a7b4d'"""
+    op.execute("DROP TRIGGER count_downloaded_downloads ON download.downloads")
+    op.execute("DROP TRIGGER count_requested_downloads ON download.downloads")
+    op.execute("DROP FUNCTION download.count_downloaded_downloads()")
+    op.execute("DROP FUNCTION download.count_requested_downloads()")
+    op.drop_table("download_counters", schema="download")
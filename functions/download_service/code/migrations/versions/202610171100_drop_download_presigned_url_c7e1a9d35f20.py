@@ -0,0 +1,29 @@
+"""drop download presigned url
+
+Revision ID: c7e1a9d35f20
+Revises: 8b2d4f6a1c3e
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e1a9d35f20"
+down_revision: str | None = "8b2d4f6a1c3e"
+branch_labels: str | list[str] | None = None
+depends_on: str | list[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade to 'c7e1a9d35f20'"""
+    op.drop_column("downloads", "presigned_url", schema="download")
+
+
+def downgrade() -> None:
+    """Downgrade to '8b2d4f6a1c3e'"""
+    # The URLs are generated on redemption now, so the old values can't be restored
+    op.add_column("downloads", sa.Column("presigned_url", sqlmodel.String(), nullable=True), schema="download")
@@ -0,0 +1,50 @@
+"""add outbox events
+
+Revision ID: 5a8e2c4b9d17
+Revises: c7e1a9d35f20
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5a8e2c4b9d17"
+down_revision: str | None = "c7e1a9d35f20"
+branch_labels: str | list[str] | None = None
+depends_on: str | list[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade to '5a8e2c4b9d17'"""
+    op.create_table(
+        "outbox_events",
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("source", sqlmodel.String(), nullable=False),
+        sa.Column("detail_type", sqlmodel.String(), nullable=False),
+        sa.Column("detail", sqlmodel.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        schema="download",
+    )
+    op.create_index(op.f("ix_download_outbox_events_created_at"), "outbox_events", ["created_at"], unique=False, schema="download")
+    op.create_index(
+        "ix_download_outbox_events_pending",
+        "outbox_events",
+        ["created_at"],
+        unique=False,
+        schema="download",
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade to 'c7e1a9d35f20'"""
+    op.drop_index("ix_download_outbox_events_pending", table_name="outbox_events", schema="download")
+    op.drop_index(op.f("ix_download_outbox_events_created_at"), table_name="outbox_events", schema="download")
+    op.drop_table("outbox_events", schema="download")
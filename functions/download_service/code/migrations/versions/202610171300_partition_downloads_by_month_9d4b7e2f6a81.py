@@ -0,0 +1,136 @@
+"""partition downloads by month
+
+Revision ID: 9d4b7e2f6a81
+Revises: 5a8e2c4b9d17
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4b7e2f6a81"
+down_revision: str | None = "5a8e2c4b9d17"
+branch_labels: str | list[str] | None = None
+depends_on: str | list[str] | None = None
+
+# Number of monthly partitions created ahead of the current month
+PARTITIONS_AHEAD = 3
+
+COLUMNS = "created_at, id, email, name, link, expires_at, is_downloaded, downloaded_at"
+
+
+def create_downloads_table(primary_key: sa.PrimaryKeyConstraint, **kwargs) -> None:
+    """Create the downloads table and its indexes"""
+    op.create_table(
+        "downloads",
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("email", sqlmodel.String(), nullable=False),
+        sa.Column("name", sqlmodel.String(), nullable=False),
+        sa.Column("link", sqlmodel.String(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("is_downloaded", sa.Boolean(), nullable=False),
+        sa.Column("downloaded_at", sa.DateTime(timezone=True), nullable=True),
+        primary_key,
+        schema="download",
+        **kwargs,
+    )
+    op.create_index(op.f("ix_download_downloads_created_at"), "downloads", ["created_at"], unique=False, schema="download")
+    op.create_index(op.f("ix_download_downloads_email"), "downloads", ["email"], unique=False, schema="download")
+
+
+def rename_downloads_table(new_name: str) -> None:
+    """Rename the downloads table with its indexes and primary key, making room for its replacement"""
+    op.execute(f"ALTER TABLE download.downloads RENAME TO {new_name}")
+    op.execute(f"ALTER TABLE download.{new_name} RENAME CONSTRAINT downloads_pkey TO {new_name}_pkey")
+    op.execute(f"ALTER INDEX download.ix_download_downloads_created_at RENAME TO ix_download_{new_name}_created_at")
+    op.execute(f"ALTER INDEX download.ix_download_downloads_email RENAME TO ix_download_{new_name}_email")
+
+
+def create_counter_triggers() -> None:
+    """Create the triggers maintaining the download counters"""
+    op.execute(
+        """
+        CREATE TRIGGER count_requested_downloads
+        AFTER INSERT ON download.downloads
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION download.count_requested_downloads()
+        """,
+    )
+    op.execute(
+        """
+        CREATE TRIGGER count_downloaded_downloads
+        AFTER UPDATE ON download.downloads
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION download.count_downloaded_downloads()
+        """,
+    )
+
+
+def drop_counter_triggers(table_name: str) -> None:
+    """Drop the triggers maintaining the download counters"""
+    op.execute(f"DROP TRIGGER count_downloaded_downloads ON download.{table_name}")
+    op.execute(f"DROP TRIGGER count_requested_downloads ON download.{table_name}")
+
+
+def upgrade() -> None:
+    """Upgrade to '9d4b7e2f6a81'"""
+    drop_counter_triggers("downloads")
+    rename_downloads_table("downloads_unpartitioned")
+
+    # The partition key must be part of the primary key
+    create_downloads_table(sa.PrimaryKeyConstraint("id", "created_at"), postgresql_partition_by="RANGE (created_at)")
+
+    # Catches the rows outside of the monthly partitions, until the sweeper creates their partition
+    op.execute("CREATE TABLE download.downloads_default PARTITION OF download.downloads DEFAULT")
+
+    # One partition per month, from the oldest download up to PARTITIONS_AHEAD months ahead
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month_start timestamptz;
+        BEGIN
+            FOR month_start IN
+                SELECT generate_series(
+                    date_trunc('month', coalesce(min(created_at), now()), 'UTC'),
+                    date_trunc('month', now(), 'UTC') + interval '{PARTITIONS_AHEAD} months',
+                    interval '1 month'
+                )
+                FROM download.downloads_unpartitioned
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE download.%I PARTITION OF download.downloads FOR VALUES FROM (%L) TO (%L)',
+                    'downloads_p' || to_char(month_start AT TIME ZONE 'UTC', 'YYYY_MM'),
+                    month_start,
+                    month_start + interval '1 month'
+                );
+            END LOOP;
+        END;
+        $$
+        """,  # noqa: S608
+    )
+
+    # Copied before the triggers exist, so the counters aren't incremented twice
+    op.execute(f"INSERT INTO download.downloads ({COLUMNS}) SELECT {COLUMNS} FROM download.downloads_unpartitioned")  # noqa: S608
+    op.drop_table("downloads_unpartitioned", schema="download")
+
+    create_counter_triggers()
+
+
+def downgrade() -> None:
+    """Downgrade to '5a8e2c4b9d17'"""
+    drop_counter_triggers("downloads")
+    rename_downloads_table("downloads_partitioned")
+
+    create_downloads_table(sa.PrimaryKeyConstraint("id"))
+
+    op.execute(f"INSERT INTO download.downloads ({COLUMNS}) SELECT {COLUMNS} FROM download.downloads_partitioned")  # noqa: S608
+    # Drops the partitions too
+    op.drop_table("downloads_partitioned", schema="download")
+
+    create_counter_triggers()
@@ -0,0 +1,50 @@
+"""add outbox retry backoff
+
+Revision ID: 1c6f3a8d2e94
+Revises: 9d4b7e2f6a81
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1c6f3a8d2e94"
+down_revision: str | None = "9d4b7e2f6a81"
+branch_labels: str | list[str] | None = None
+depends_on: str | list[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade to '1c6f3a8d2e94'"""
+    # The pending events are relayed right away
+    op.add_column(
+        "outbox_events",
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        schema="download",
+    )
+    op.drop_index("ix_download_outbox_events_pending", table_name="outbox_events", schema="download")
+    op.create_index(
+        "ix_download_outbox_events_pending",
+        "outbox_events",
+        ["next_attempt_at"],
+        unique=False,
+        schema="download",
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade to '9d4b7e2f6a81'"""
+    op.drop_index("ix_download_outbox_events_pending", table_name="outbox_events", schema="download")
+    op.create_index(
+        "ix_download_outbox_events_pending",
+        "outbox_events",
+        ["created_at"],
+        unique=False,
+        schema="download",
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+    op.drop_column("outbox_events", "next_attempt_at", schema="download")
@@ -1 +1,4 @@
-from code.models.download import Download, DownloadCreate, DownloadResponse, DownloadStatistics
+from code.models.download import Download, DownloadCreate, DownloadRequestResult, DownloadResponse, DownloadStatistics
+from code.models.download_counter import DownloadCounter
+from code.models.outbox_event import OutboxEvent
+from code.models.request_throttle import RequestThrottle
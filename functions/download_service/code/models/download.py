@@ -1,9 +1,10 @@
 import datetime as dt
 from code.environment import (
-    FRONTEND_URL,
+    DOWNLOAD_LINK_URL,
     TOKEN_EXPIRATION_HOURS,
 )
 from code.models.base import UuidModel
+from code.tokens import sign_token
 from typing import ClassVar
 
 from pydantic import BaseModel, EmailStr
@@ -14,7 +15,19 @@ class Download(UuidModel, table=True):
     """Download model"""
 
     __tablename__: ClassVar = "downloads"
-    __table_args__: ClassVar = {"keep_existing": True, "schema": "download"}
+    __table_args__: ClassVar = {
+        "keep_existing": True,
+        "schema": "download",
+        "postgresql_partition_by": "RANGE (created_at)",
+    }
+
+    # Monthly partitions, so the partition key is part of the primary key
+    created_at: dt.datetime = Field(
+        sa_type=DateTime(timezone=True),
+        default_factory=lambda: dt.datetime.now(dt.UTC),
+        primary_key=True,
+        index=True,
+    )
 
     email: EmailStr = Field(
         title="Email address",
@@ -53,15 +66,10 @@ class Download(UuidModel, table=True):
         default=None,
     )
 
-    presigned_url: str = Field(
-        title="Pre-signed URL",
-        description="The pre-signed URL to download the file",
-    )
-
     def __init__(self, **data) -> None:
         super().__init__(**data)
         if not self.link:
-            self.link = f"https://{FRONTEND_URL}/download/{self.id.hex}"
+            self.link = f"{DOWNLOAD_LINK_URL}/{sign_token(self.id, self.expires_at)}"
 
 
 class DownloadCreate(BaseModel):
@@ -71,6 +79,14 @@ class DownloadCreate(BaseModel):
     email: EmailStr
 
 
+class DownloadRequestResult(BaseModel):
+    """Pydantic model to return the outcome of a request in a batch"""
+
+    email: EmailStr
+    is_accepted: bool
+    detail: str | None = None
+
+
 class DownloadStatistics(BaseModel):
     """Pydantic model to count the number of downloads"""
 
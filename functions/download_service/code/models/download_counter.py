@@ -0,0 +1,39 @@
+from typing import ClassVar
+
+from sqlmodel import BigInteger, Field, SQLModel
+
+
+# Shard keeping the counts of the downloads dropped with their partition, preserved when the counters are rebuilt
+ARCHIVED_SHARD = -1
+
+
+class DownloadCounter(SQLModel, table=True):
+    """Sharded counters of requested and downloaded books
+
+    The rows are maintained by triggers on the downloads table. Each write increments a random shard,
+    so concurrent requests don't contend on a single row, and the statistics are the sum of all shards.
+    """
+
+    __tablename__: ClassVar = "download_counters"
+    __table_args__: ClassVar = {"keep_existing": True, "schema": "download"}
+
+    shard: int = Field(
+        title="Shard",
+        description="The shard number of the counter",
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": False},
+    )
+
+    requested: int = Field(
+        title="Requested",
+        sa_type=BigInteger,
+        description="The number of requested books counted in this shard",
+        default=0,
+    )
+
+    downloaded: int = Field(
+        title="Downloaded",
+        sa_type=BigInteger,
+        description="The number of downloaded books counted in this shard",
+        default=0,
+    )
@@ -0,0 +1,51 @@
+import datetime as dt
+from code.models.base import UuidModel
+from typing import ClassVar
+
+from sqlmodel import DateTime, Field, Index, text
+
+
+class OutboxEvent(UuidModel, table=True):
+    """Event written in the same transaction as the change it describes, waiting to be relayed to EventBridge"""
+
+    __tablename__: ClassVar = "outbox_events"
+    __table_args__: ClassVar = (
+        Index("ix_download_outbox_events_pending", "next_attempt_at", postgresql_where=text("published_at IS NULL")),
+        {"keep_existing": True, "schema": "download"},
+    )
+
+    source: str = Field(
+        title="Source",
+        description="The source of the event",
+    )
+
+    detail_type: str = Field(
+        title="Detail type",
+        description="The detail type of the event in the form of '{prefix}.{type}'",
+    )
+
+    detail: str = Field(
+        title="Detail",
+        description="A JSON string that contains the event data",
+    )
+
+    attempts: int = Field(
+        title="Attempts",
+        description="The number of failed attempts to publish the event",
+        default=0,
+    )
+
+    next_attempt_at: dt.datetime = Field(
+        sa_type=DateTime(timezone=True),
+        title="Next attempt at",
+        description="The date and time from which the event can be relayed, pushed back after each failed attempt",
+        default_factory=lambda: dt.datetime.now(dt.UTC),
+        sa_column_kwargs={"server_default": text("now()")},
+    )
+
+    published_at: dt.datetime | None = Field(
+        sa_type=DateTime(timezone=True),
+        title="Published at",
+        description="The date and time when the event was published to EventBridge",
+        default=None,
+    )
@@ -0,0 +1,24 @@
+import datetime as dt
+from typing import ClassVar
+
+from pydantic import EmailStr
+from sqlmodel import DateTime, Field, SQLModel
+
+
+class RequestThrottle(SQLModel, table=True):
+    """Last accepted download request per email, used to enforce the backoff window"""
+
+    __tablename__: ClassVar = "request_throttles"
+    __table_args__: ClassVar = {"keep_existing": True, "schema": "download"}
+
+    email: EmailStr = Field(
+        title="Email address",
+        description="The email of the person who requested the download",
+        primary_key=True,
+    )
+
+    requested_at: dt.datetime = Field(
+        title="Requested at",
+        sa_type=DateTime(timezone=True),
+        description="The date and time of the last accepted download request",
+    )
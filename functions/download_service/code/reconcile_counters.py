@@ -0,0 +1,22 @@
+import asyncio
+from code.db import session_context
+from code.environment import SERVICE_NAME
+from code.models import DownloadStatistics
+from code.repos.download import DownloadRepo
+
+from aws_lambda_powertools import Logger
+
+
+logger = Logger(service=SERVICE_NAME)
+
+
+async def reconcile() -> DownloadStatistics:
+    """Rebuild the download counters from the downloads table"""
+
+    async with session_context() as session:
+        repo = DownloadRepo(session=session)
+        return await repo.reconcile_statistics()
+
+
+if __name__ == "__main__":
+    asyncio.run(reconcile())
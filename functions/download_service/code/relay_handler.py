@@ -0,0 +1,72 @@
+import asyncio
+import time
+from code.db import session_context
+from code.environment import OUTBOX_POLL_INTERVAL_SECONDS, OUTBOX_RELAY_LIMIT, OUTBOX_RELAY_SECONDS, SERVICE_NAME
+from code.eventbridge import get_eventbridge_context
+from code.repos.outbox import OutboxRepo
+from typing import Any
+
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+
+logger = Logger(service=SERVICE_NAME)
+tracer = Tracer(service=SERVICE_NAME)
+
+# Input of the relay schedule, telling it apart from the keep warm events
+RELAY_ACTION = "relay"
+
+# Reused across invocations, so pooled connections stay bound to a live loop
+loop = asyncio.new_event_loop()
+
+
+@tracer.capture_method(capture_response=False)
+async def relay() -> int:
+    """Relay the outbox to EventBridge, polling it for new events until OUTBOX_RELAY_SECONDS elapse.
+
+    Returns
+    -------
+        int: the number of processed events
+
+    """
+
+    deadline = time.monotonic() + OUTBOX_RELAY_SECONDS
+    processed_count = 0
+
+    async with session_context() as session, get_eventbridge_context() as eventbridge:
+        repo = OutboxRepo(session=session, eventbridge=eventbridge)
+        await repo.purge()
+
+        while True:
+            count = await repo.relay()
+            processed_count += count
+
+            remaining_seconds = deadline - time.monotonic()
+            if remaining_seconds <= 0:
+                break
+
+            # A full batch means more events may be waiting
+            if count < OUTBOX_RELAY_LIMIT:
+                await asyncio.sleep(min(OUTBOX_POLL_INTERVAL_SECONDS, remaining_seconds))
+
+    return processed_count
+
+
+@logger.inject_lambda_context(log_event=True)
+@tracer.capture_lambda_handler(capture_response=False)
+def handler(event: dict[str, Any], _context: LambdaContext) -> dict[str, int] | None:
+    """AWS Lambda handler relaying the outbox events. Triggered by a schedule."""
+
+    # A keep warm event would start a relay overlapping the scheduled one
+    if event.get("action") != RELAY_ACTION:
+        logger.info("Keep warm event.")
+        return None
+
+    processed_count = loop.run_until_complete(relay())
+    logger.info("Outbox relay finished", processed_count=processed_count)
+
+    return {"processed": processed_count}
+
+
+if __name__ == "__main__":
+    loop.run_until_complete(relay())
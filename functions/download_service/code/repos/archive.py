@@ -0,0 +1,111 @@
+import datetime as dt
+import json
+from code.environment import (
+    ARCHIVE_CHUNK_SIZE,
+    ARCHIVE_DELETE_BATCH_SIZE,
+    ARCHIVE_PREFIX,
+    DOWNLOADS_RETENTION_DAYS,
+    SERVICE_NAME,
+)
+from code.models import Download
+from code.repos.download import DownloadRepo
+from code.s3 import S3
+from typing import Any
+
+from aws_lambda_powertools import Logger, Tracer
+from sqlalchemy import ColumnElement, and_, delete, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import col, select
+
+
+tracer = Tracer(service=SERVICE_NAME)
+logger = Logger(service=SERVICE_NAME)
+
+
+def json_default(value: Any) -> str:
+    """Serialize the column types json doesn't know, datetimes in ISO 8601"""
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class DownloadArchiveRepo:
+    """Repository archiving old downloads to S3 before removing them from the table"""
+
+    def __init__(self, session: AsyncSession, s3: S3) -> None:
+        self.__session = session
+        self.__s3 = s3
+
+    @tracer.capture_method(capture_response=False)
+    async def archive(self, retention_days: int = DOWNLOADS_RETENTION_DAYS) -> int:
+        """Archive the downloads older than the retention to a gzip NDJSON object, then delete them
+
+        The rows are streamed with a server-side cursor in chunks of ARCHIVE_CHUNK_SIZE and uploaded in
+        parts, so memory use doesn't depend on the number of archived rows. They are only deleted once the
+        upload is complete. Only expired links are archived: they can't change anymore, so the rows
+        deleted afterwards are exactly the archived ones.
+
+        Returns
+        -------
+            int: the number of archived downloads
+
+        """
+
+        started_at = dt.datetime.now(dt.UTC)
+        condition = and_(
+            col(Download.created_at) < started_at - dt.timedelta(days=retention_days),
+            col(Download.expires_at) <= started_at,
+        )
+        key = f"{ARCHIVE_PREFIX}/{started_at:%Y/%m/%d}/downloads-{started_at:%Y%m%dT%H%M%SZ}.ndjson.gz"
+
+        archived_count = 0
+        async with self.__s3.upload_gzip(key=key) as upload:
+            stmt = select(Download.__table__).where(condition).execution_options(yield_per=ARCHIVE_CHUNK_SIZE)
+            result = await self.__session.stream(stmt)
+            async for rows in result.partitions():
+                lines = [json.dumps(row._asdict(), default=json_default) for row in rows]
+                await upload.write(("\n".join(lines) + "\n").encode())
+                archived_count += len(rows)
+
+            # Closes the cursor
+            await self.__session.commit()
+
+        if not archived_count:
+            logger.info("No downloads to archive")
+            return 0
+
+        deleted_count = 0
+        while batch_count := await self.__delete_batch(condition):
+            deleted_count += batch_count
+
+        logger.info("Archived downloads", object_key=key, archived_count=archived_count, deleted_count=deleted_count)
+
+        return archived_count
+
+    async def __delete_batch(self, condition: ColumnElement[bool]) -> int:
+        """Delete up to ARCHIVE_DELETE_BATCH_SIZE archived downloads in their own transaction
+
+        Returns
+        -------
+            int: the number of deleted downloads
+
+        """
+
+        batch = select(Download.id, Download.created_at).where(condition).limit(ARCHIVE_DELETE_BATCH_SIZE)
+        stmt = (
+            delete(Download)
+            .where(tuple_(col(Download.id), col(Download.created_at)).in_(batch))
+            .returning(col(Download.is_downloaded))
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.__session.execute(stmt)
+        is_downloaded = result.scalars().all()
+
+        if is_downloaded:
+            await DownloadRepo(session=self.__session).archive_statistics(
+                requested=len(is_downloaded),
+                downloaded=sum(is_downloaded),
+            )
+        await self.__session.commit()
+
+        return len(is_downloaded)
@@ -1,126 +1,375 @@
 import datetime as dt
-from code.environment import BACKOFF_SECONDS, SERVICE_NAME
-from code.eventbridge import EventBridge
-from code.models import Download, DownloadCreate, DownloadStatistics
-from code.s3 import S3
+from code.db import read_only
+from code.environment import BACKOFF_SECONDS, DOWNLOADS_PRUNE_BY_TOKEN_TIME, SERVICE_NAME
+from code.models import (
+    Download,
+    DownloadCounter,
+    DownloadCreate,
+    DownloadRequestResult,
+    DownloadStatistics,
+    OutboxEvent,
+    RequestThrottle,
+)
+from code.models.base import uuid7_timestamp
+from code.models.download_counter import ARCHIVED_SHARD
+from collections.abc import Sequence
+from typing import NoReturn
 from uuid import UUID
 
 from aws_lambda_powertools import Logger, Tracer
 from fastapi import HTTPException, status
+from sqlalchemy import CTE, ColumnElement, Uuid, cast, column, delete, insert, literal, text, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import func, select
+from sqlmodel import SQLModel, col, func, select
 
 
 tracer = Tracer(service=SERVICE_NAME)
 logger = Logger(service=SERVICE_NAME)
 
 
+def token_conditions(token: UUID) -> list[ColumnElement[bool]]:
+    """Match the download of a token, narrowing down created_at when the token carries its time
+
+    A UUIDv7 token is generated from the created_at of its download, to the millisecond, so the
+    lookup only scans the partition of that month instead of the index of every partition.
+    """
+
+    conditions = [col(Download.id) == token]
+    if DOWNLOADS_PRUNE_BY_TOKEN_TIME and (created_at := uuid7_timestamp(token)) is not None:
+        conditions += [
+            col(Download.created_at) >= created_at,
+            col(Download.created_at) < created_at + dt.timedelta(milliseconds=1),
+        ]
+    return conditions
+
+
+def records_values(name: str, records: Sequence[SQLModel], keys: Sequence[UUID] | None = None) -> CTE:
+    """Select records from a VALUES list typed after their table columns, to insert them from a SELECT
+
+    `keys` adds a leading "key" column, to join each row to a row inserted by the same statement.
+    """
+
+    model = type(records[0])
+    columns = [column(name, model.__table__.columns[name].type) for name in model.model_fields]
+    rows = [tuple(getattr(record, name) for name in model.model_fields) for record in records]
+
+    if keys is not None:
+        columns.insert(0, column("key", Uuid()))
+        rows = [(key, *row) for key, row in zip(keys, rows, strict=True)]
+
+    rows_values = values(*columns, name=f"{name}_values").data(rows)
+
+    # VALUES types NULL columns as text, so every column is cast to the type of the table column
+    return select(*[cast(rows_values.c[column.name], column.type).label(column.name) for column in columns]).cte(name)
+
+
 class DownloadRepo:
     """Download repository"""
 
-    def __init__(self, session: AsyncSession, eventbridge: EventBridge, s3: S3) -> None:
+    def __init__(self, session: AsyncSession) -> None:
         self.__session = session
-        self.__eventbridge = eventbridge
-        self.__s3 = s3
         self.__event_source = "downloadService"
         self.__event_prefix = "book"
 
     @tracer.capture_method(capture_response=False)
     async def get(self, token: UUID) -> Download:
-        """Get a new book download link"""
+        """Redeem a book download token
+
+        The token is redeemed with a single conditional UPDATE, so two concurrent redemptions
+        of the same token can't both succeed. The record is only looked up again when the
+        update doesn't match, to pick the right error message.
+        """
 
-        current_timestamp = dt.datetime.now(tz=dt.UTC)
-        stmt = select(Download).where(Download.id == token)
+        stmt = (
+            update(Download)
+            .where(
+                *token_conditions(token),
+                col(Download.is_downloaded).is_(False),
+                col(Download.expires_at) > func.now(),
+            )
+            .values(is_downloaded=True, downloaded_at=func.now())
+            .returning(Download)
+            .execution_options(synchronize_session=False)
+        )
         result = await self.__session.execute(stmt)
         record = result.scalars().one_or_none()
 
         if not record:
+            await self.__raise_redeem_error(token)
+
+        logger.info("Redeemed record", record=record.model_dump_json())
+
+        self.__session.add(self.__outbox_event(type="downloaded", detail=record.model_dump_json()))
+        await self.__session.commit()
+
+        return record
+
+    async def __raise_redeem_error(self, token: UUID) -> NoReturn:
+        """Raise the HTTP error explaining why a token couldn't be redeemed"""
+
+        stmt = select(Download.is_downloaded).where(*token_conditions(token))
+        result = await self.__session.execute(stmt)
+        is_downloaded = result.scalar_one_or_none()
+
+        if is_downloaded is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Invalid link.",
             )
 
-        if record.is_downloaded:
+        if is_downloaded:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Link already used.",
             )
 
-        if current_timestamp > record.expires_at:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Link expired.",
+        )
+
+    @tracer.capture_method(capture_response=False)
+    async def request(
+        self,
+        new: DownloadCreate,
+    ) -> Download:
+        """Create a new download request"""
+
+        new_record = Download(**new.model_dump())
+
+        [(is_inserted, last_requested_at)] = await self.__insert_throttled([new_record])
+
+        if not is_inserted:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail="Link expired.",
+                detail=self.__backoff_message(last_requested_at),
             )
 
-        record.downloaded_at = current_timestamp
-        record.is_downloaded = True
+        logger.info("Created record", record=new_record.model_dump_json())
+
+        await self.__session.commit()
 
-        logger.info("Updating record", record=record.model_dump_json())
+        return new_record
+
+    @tracer.capture_method(capture_response=False)
+    async def request_batch(
+        self,
+        new: list[DownloadCreate],
+    ) -> list[DownloadRequestResult]:
+        """Create download requests in bulk, applying the backoff to each email
+
+        All the requests are throttled and inserted with a single statement. When an email appears more
+        than once in the batch, only its first request is considered and the others are rejected.
+
+        Returns
+        -------
+            list[DownloadRequestResult]: whether each request was accepted, in the order of the batch
+
+        """
+
+        records: dict[str, Download] = {}
+        for item in new:
+            if item.email not in records:
+                records[item.email] = Download(**item.model_dump())
+
+        outcomes = await self.__insert_throttled(list(records.values()))
+        results = dict(zip(records, outcomes, strict=True))
 
         await self.__session.commit()
-        await self.__session.refresh(record)
-        await self.__eventbridge.put_event(
+
+        logger.info("Created records in bulk", requested_count=len(new), created_count=sum(is_inserted for is_inserted, _ in outcomes))
+
+        response = []
+        seen_emails: set[str] = set()
+        for item in new:
+            is_inserted, last_requested_at = results[item.email]
+            if item.email in seen_emails:
+                # Repeated email: throttled by the first request of the batch
+                last_requested_at = records[item.email].created_at if is_inserted else last_requested_at
+                is_inserted = False
+            seen_emails.add(item.email)
+
+            response.append(
+                DownloadRequestResult(
+                    email=item.email,
+                    is_accepted=is_inserted,
+                    detail=None if is_inserted else self.__backoff_message(last_requested_at),
+                ),
+            )
+
+        return response
+
+    @staticmethod
+    def __backoff_message(last_requested_at: dt.datetime | None) -> str:
+        """Explain when an email still inside the backoff window can request again"""
+
+        remaining_time = BACKOFF_SECONDS
+        if last_requested_at:
+            elapsed_time = int((dt.datetime.now(tz=dt.UTC) - last_requested_at).total_seconds())
+            remaining_time = max(BACKOFF_SECONDS - elapsed_time, 1)
+
+        return f"You have already requested a download link. Please check your email inbox or try again in {remaining_time} seconds."
+
+    def __outbox_event(self, type: str, detail: str) -> OutboxEvent:
+        """Build the outbox event of a change, to be written in the same transaction"""
+        return OutboxEvent(
             source=self.__event_source,
-            prefix=self.__event_prefix,
-            type="downloaded",
-            detail=record.model_dump_json(),
+            detail_type=f"{self.__event_prefix}.{type}",
+            detail=detail,
         )
 
-        return record
+    async def __insert_throttled(self, records: list[Download]) -> list[tuple[bool, dt.datetime | None]]:
+        """Insert download requests and their outbox events unless their email is still inside the backoff window
 
-    @tracer.capture_method(capture_response=False)
-    async def request(
-        self,
-        new: DownloadCreate,
-    ) -> Download:
-        """Create a new download request"""
+        The per-email throttle rows are upserted only when the previous request is older than
+        BACKOFF_SECONDS, and the downloads and their events are inserted only for the emails whose upsert
+        happened, all in one statement. ON CONFLICT serializes concurrent requests for the same email.
+        The emails of the records must be unique.
+
+        Returns
+        -------
+            list[tuple[bool, dt.datetime | None]]: for each record, whether it was inserted and, if not, when its email was last accepted
+
+        """
+
+        events = [self.__outbox_event(type="requested", detail=record.model_dump_json()) for record in records]
 
-        presigned_url = await self.__s3.generate_ebook_presigned_url()
-        new_record = Download(
-            **new.model_dump(),
-            presigned_url=presigned_url,
+        upsert = pg_insert(RequestThrottle).values([{"email": record.email, "requested_at": record.created_at} for record in records])
+        throttle = (
+            upsert.on_conflict_do_update(
+                index_elements=[RequestThrottle.email],
+                set_={"requested_at": upsert.excluded.requested_at},
+                where=col(RequestThrottle.requested_at) <= upsert.excluded.requested_at - dt.timedelta(seconds=BACKOFF_SECONDS),
+            )
+            .returning(RequestThrottle.email)
+            .cte("throttle")
         )
 
-        stmt = select(Download).where(
-            Download.email == new_record.email,
-            Download.created_at >= dt.datetime.now(dt.UTC) - dt.timedelta(seconds=BACKOFF_SECONDS),
+        new_downloads = records_values("new_downloads", records)
+        inserted = (
+            insert(Download)
+            .from_select(
+                list(Download.model_fields),
+                select(*[new_downloads.c[name] for name in Download.model_fields]).join(
+                    throttle,
+                    throttle.c.email == new_downloads.c.email,
+                ),
+            )
+            .returning(col(Download.id))
+            .cte("inserted")
         )
-        result = await self.__session.execute(stmt)
-        record = result.scalars().one_or_none()
 
-        if record:
-            remaining_time = BACKOFF_SECONDS - (dt.datetime.now(tz=dt.UTC) - record.created_at).seconds
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"You have already requested a download link. Please check your email inbox or try again in {remaining_time} seconds.",
+        new_events = records_values("new_events", events, keys=[record.id for record in records])
+        outbox = (
+            insert(OutboxEvent)
+            .from_select(
+                list(OutboxEvent.model_fields),
+                select(*[new_events.c[name] for name in OutboxEvent.model_fields]).join(inserted, inserted.c.id == new_events.c.key),
             )
+            .cte("outbox")
+        )
+
+        # The main query sees the throttle rows as they were before the statement, i.e. when each email was last accepted
+        stmt = (
+            select(new_downloads.c.id, inserted.c.id, RequestThrottle.requested_at)
+            .select_from(new_downloads)
+            .outerjoin(inserted, inserted.c.id == new_downloads.c.id)
+            .outerjoin(RequestThrottle, RequestThrottle.email == new_downloads.c.email)
+            .add_cte(outbox)
+        )
+        result = await self.__session.execute(stmt)
+        outcomes = {
+            record_id: (inserted_id is not None, last_requested_at) for record_id, inserted_id, last_requested_at in result.all()
+        }
+
+        return [outcomes[record.id] for record in records]
+
+    @tracer.capture_method(capture_response=False)
+    async def prune_throttles(self) -> int:
+        """Delete the throttle rows of the emails past the backoff window, which no longer throttle anything
 
-        self.__session.add(new_record)
+        Returns
+        -------
+            int: the number of deleted rows
 
-        logger.info("Creating record", record=new_record.model_dump_json())
+        """
 
+        stmt = delete(RequestThrottle).where(col(RequestThrottle.requested_at) <= func.now() - dt.timedelta(seconds=BACKOFF_SECONDS))
+        result = await self.__session.execute(stmt)
         await self.__session.commit()
-        await self.__session.refresh(new_record)
-        await self.__eventbridge.put_event(
-            source=self.__event_source,
-            prefix=self.__event_prefix,
-            type="requested",
-            detail=new_record.model_dump_json(),
-        )
 
-        return new_record
+        logger.info("Pruned request throttles", pruned_count=result.rowcount)
+
+        return result.rowcount
 
     @tracer.capture_method(capture_response=False)
+    @read_only
     async def get_statistics(
         self,
     ) -> DownloadStatistics:
-        """Count the number of requested and downloaded books"""
-        stmt = select(func.count()).select_from(Download).where(Download.is_downloaded)
-        result = await self.__session.execute(stmt)
-        downloaded_count = result.scalar_one()
+        """Count the number of requested and downloaded books by summing the counter shards
+
+        Runs on the reader, unless the session already wrote, e.g. when reconciling the counters.
+        """
 
-        stmt = select(func.count()).select_from(Download)
+        stmt = select(
+            func.coalesce(func.sum(DownloadCounter.requested), 0),
+            func.coalesce(func.sum(DownloadCounter.downloaded), 0),
+        )
         result = await self.__session.execute(stmt)
-        requested_count = result.scalar_one()
+        requested_count, downloaded_count = result.one()
 
         return DownloadStatistics(requested=requested_count, downloaded=downloaded_count)
+
+    async def archive_statistics(self, requested: int, downloaded: int) -> None:
+        """Move counts from a live shard to the archived shard, before their downloads leave the table
+
+        The sum of the shards is unchanged, and the counts survive the counters being rebuilt.
+        The caller commits, in the same transaction as the removal of the downloads.
+        """
+
+        stmt = pg_insert(DownloadCounter).values(
+            [
+                {"shard": ARCHIVED_SHARD, "requested": requested, "downloaded": downloaded},
+                {"shard": 0, "requested": -requested, "downloaded": -downloaded},
+            ],
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DownloadCounter.shard],
+            set_={
+                "requested": DownloadCounter.requested + stmt.excluded.requested,
+                "downloaded": DownloadCounter.downloaded + stmt.excluded.downloaded,
+            },
+        )
+        await self.__session.execute(stmt)
+
+    @tracer.capture_method(capture_response=False)
+    async def reconcile_statistics(
+        self,
+    ) -> DownloadStatistics:
+        """Rebuild the counter shards from the downloads table
+
+        The counters table is locked while it is rebuilt, so concurrent requests wait for the new
+        counts instead of incrementing shards that are about to be replaced. The archived shard is kept,
+        as its downloads are no longer in the table.
+        """
+
+        await self.__session.execute(text(f"LOCK TABLE {DownloadCounter.__table__.fullname} IN EXCLUSIVE MODE"))
+        await self.__session.execute(delete(DownloadCounter).where(col(DownloadCounter.shard) != ARCHIVED_SHARD))
+
+        stmt = select(
+            literal(0),
+            func.count(),
+            func.count().filter(col(Download.is_downloaded)),
+        ).select_from(Download)
+        await self.__session.execute(
+            insert(DownloadCounter).from_select(["shard", "requested", "downloaded"], stmt),
+        )
+        statistics = await self.get_statistics()
+
+        await self.__session.commit()
+
+        logger.info("Reconciled download counters", statistics=statistics.model_dump_json())
+
+        return statistics
@@ -0,0 +1,141 @@
+import asyncio
+import datetime as dt
+from code.environment import (
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RELAY_LIMIT,
+    OUTBOX_RETENTION_DAYS,
+    OUTBOX_RETRY_BASE_SECONDS,
+    OUTBOX_RETRY_MAX_SECONDS,
+    SERVICE_NAME,
+)
+from code.eventbridge import EventBridge
+from code.models import OutboxEvent
+
+from aws_lambda_powertools import Logger, Tracer
+from botocore.exceptions import BotoCoreError, ClientError
+from sqlalchemy import delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import col, select
+
+
+tracer = Tracer(service=SERVICE_NAME)
+logger = Logger(service=SERVICE_NAME)
+
+# PutEvents accepts at most 10 entries per call
+PUT_EVENTS_BATCH_SIZE = 10
+
+# Number of times the failed entries of a batch are retried within a relay run
+PUT_EVENTS_RETRIES = 2
+
+
+def retry_delay(attempts: int) -> dt.timedelta:
+    """Return how long an event waits before being relayed again after its failed attempts"""
+    return dt.timedelta(seconds=min(OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), OUTBOX_RETRY_MAX_SECONDS))
+
+
+class OutboxRepo:
+    """Outbox repository"""
+
+    def __init__(self, session: AsyncSession, eventbridge: EventBridge) -> None:
+        self.__session = session
+        self.__eventbridge = eventbridge
+
+    @tracer.capture_method(capture_response=False)
+    async def relay(self, limit: int = OUTBOX_RELAY_LIMIT) -> int:
+        """Publish pending outbox events to EventBridge in batches of up to 10 entries
+
+        Pending rows are locked with SKIP LOCKED, so concurrent relays never publish the same event twice.
+        Events that still fail after the retries keep their pending state, count a failed attempt and
+        wait with an exponential backoff, so an EventBridge outage doesn't use up their attempts within minutes.
+        The events out of attempts are dead-lettered: logged as an error and left in the table.
+
+        Returns
+        -------
+            int: the number of pending events that were processed
+
+        """
+
+        stmt = (
+            select(OutboxEvent)
+            .where(
+                col(OutboxEvent.published_at).is_(None),
+                col(OutboxEvent.attempts) < OUTBOX_MAX_ATTEMPTS,
+                col(OutboxEvent.next_attempt_at) <= func.now(),
+            )
+            .order_by(col(OutboxEvent.next_attempt_at))
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.__session.execute(stmt)
+        events = list(result.scalars().all())
+
+        if not events:
+            await self.__session.commit()
+            return 0
+
+        published_count = 0
+        for start in range(0, len(events), PUT_EVENTS_BATCH_SIZE):
+            published_count += await self.__publish(events[start : start + PUT_EVENTS_BATCH_SIZE])
+
+        await self.__session.commit()
+
+        logger.info("Outbox relayed", event_count=len(events), published_count=published_count)
+
+        return len(events)
+
+    async def __publish(self, events: list[OutboxEvent]) -> int:
+        """Put a batch of events, retrying only the entries that failed
+
+        Returns
+        -------
+            int: the number of published events
+
+        """
+
+        pending = events
+        for attempt in range(PUT_EVENTS_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(0.1 * 2**attempt)
+
+            try:
+                event_ids = await self.__eventbridge.put_events(
+                    [{"Source": event.source, "DetailType": event.detail_type, "Detail": event.detail} for event in pending],
+                )
+            except (BotoCoreError, ClientError):
+                logger.exception("Failed to put outbox events", event_count=len(pending))
+                event_ids = [None] * len(pending)
+
+            published_at = dt.datetime.now(dt.UTC)
+            for event, event_id in zip(pending, event_ids, strict=True):
+                if event_id:
+                    event.published_at = published_at
+
+            pending = [event for event, event_id in zip(pending, event_ids, strict=True) if not event_id]
+            if not pending:
+                break
+
+        for event in pending:
+            event.attempts += 1
+            if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+                # Matched by the metric filter of the dead-lettered events alarm
+                logger.error("Outbox event dead-lettered", event_id=event.id, detail_type=event.detail_type, attempts=event.attempts)
+            else:
+                event.next_attempt_at = dt.datetime.now(dt.UTC) + retry_delay(event.attempts)
+                logger.warning(
+                    "Outbox event not published",
+                    event_id=event.id,
+                    attempts=event.attempts,
+                    next_attempt_at=event.next_attempt_at,
+                )
+
+        return len(events) - len(pending)
+
+    @tracer.capture_method(capture_response=False)
+    async def purge(self) -> None:
+        """Delete the events published more than OUTBOX_RETENTION_DAYS ago"""
+
+        stmt = delete(OutboxEvent).where(
+            col(OutboxEvent.published_at) < dt.datetime.now(dt.UTC) - dt.timedelta(days=OUTBOX_RETENTION_DAYS),
+        )
+        await self.__session.execute(stmt)
+        await self.__session.commit()
@@ -0,0 +1,186 @@
+import datetime as dt
+import re
+from code.environment import DOWNLOADS_PARTITIONS_AHEAD, DOWNLOADS_RETENTION_DAYS, SERVICE_NAME
+from code.models import Download
+from code.repos.download import DownloadRepo
+
+from aws_lambda_powertools import Logger, Tracer
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+tracer = Tracer(service=SERVICE_NAME)
+logger = Logger(service=SERVICE_NAME)
+
+# Monthly partitions are named after the month of their lower bound, e.g. downloads_p2026_10
+PARTITION_NAME = re.compile(r"^downloads_p(?P<year>\d{4})_(?P<month>\d{2})$")
+
+# The partition DDL waits at most this long for its locks, instead of queueing the requests behind it
+LOCK_TIMEOUT = "5s"
+
+
+def month_start(timestamp: dt.datetime) -> dt.datetime:
+    """Return the start of the month of the timestamp, in UTC"""
+    timestamp = timestamp.astimezone(dt.UTC)
+    return dt.datetime(timestamp.year, timestamp.month, 1, tzinfo=dt.UTC)
+
+
+def next_month_start(timestamp: dt.datetime) -> dt.datetime:
+    """Return the start of the month after the timestamp, in UTC"""
+    return month_start(month_start(timestamp) + dt.timedelta(days=32))
+
+
+class DownloadPartitionRepo:
+    """Repository of the monthly partitions of the downloads table"""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.__session = session
+        self.__schema = Download.__table__.schema
+        self.__table = Download.__table__.fullname
+
+    @tracer.capture_method(capture_response=False)
+    async def create_ahead(self, months: int = DOWNLOADS_PARTITIONS_AHEAD) -> list[str]:
+        """Create the missing partitions from the current month up to `months` months ahead
+
+        Returns
+        -------
+            list[str]: the names of the created partitions
+
+        """
+
+        await self.__session.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        existing = set(await self.__partition_names())
+
+        created = []
+        start = month_start(dt.datetime.now(dt.UTC))
+        for _ in range(months + 1):
+            end = next_month_start(start)
+            name = f"downloads_p{start:%Y_%m}"
+            if name not in existing:
+                await self.__create_partition(name, start, end)
+                created.append(name)
+            start = end
+
+        await self.__session.commit()
+
+        logger.info("Created download partitions", partitions=created)
+
+        return created
+
+    @tracer.capture_method(capture_response=False)
+    async def sweep(self, retention_days: int = DOWNLOADS_RETENTION_DAYS) -> list[str]:
+        """Drop the partitions older than the retention whose links are all expired or redeemed
+
+        The counts of a dropped partition are moved to the archived counter shard, so the statistics
+        don't change and survive a reconciliation. Each partition is dropped in its own transaction.
+
+        Returns
+        -------
+            list[str]: the names of the dropped partitions
+
+        """
+
+        cutoff = dt.datetime.now(dt.UTC) - dt.timedelta(days=retention_days)
+
+        dropped = []
+        for name in sorted(await self.__partition_names()):
+            match = PARTITION_NAME.match(name)
+            if match is None:
+                continue
+
+            start = dt.datetime(int(match["year"]), int(match["month"]), 1, tzinfo=dt.UTC)
+            if next_month_start(start) > cutoff:
+                break
+
+            if await self.__drop_partition(name):
+                dropped.append(name)
+
+        logger.info("Swept download partitions", partitions=dropped)
+
+        return dropped
+
+    async def __partition_names(self) -> list[str]:
+        """Return the names of the partitions of the downloads table, including the default one"""
+
+        result = await self.__session.execute(
+            text(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = CAST(:table AS regclass)
+                """,
+            ),
+            {"table": self.__table},
+        )
+        return list(result.scalars().all())
+
+    async def __create_partition(self, name: str, start: dt.datetime, end: dt.datetime) -> None:
+        """Create a partition, moving its rows out of the default partition
+
+        Postgres refuses to attach a partition while the default partition holds rows in its range.
+        The rows are moved with direct DML on the partitions, so the counter triggers on the
+        parent table don't count them again.
+        """
+
+        partition = f"{self.__schema}.{name}"
+        await self.__session.execute(text(f"CREATE TABLE {partition} (LIKE {self.__table} INCLUDING DEFAULTS)"))
+        await self.__session.execute(
+            text(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {self.__schema}.downloads_default
+                    WHERE created_at >= :start AND created_at < :end
+                    RETURNING *
+                )
+                INSERT INTO {partition} SELECT * FROM moved
+                """,  # noqa: S608
+            ),
+            {"start": start, "end": end},
+        )
+        await self.__session.execute(
+            text(
+                f"ALTER TABLE {self.__table} ATTACH PARTITION {partition} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')",
+            ),
+        )
+
+    async def __drop_partition(self, name: str) -> bool:
+        """Archive the counts of a partition and drop it, unless it still has redeemable links
+
+        Returns
+        -------
+            bool: whether the partition was dropped
+
+        """
+
+        partition = f"{self.__schema}.{name}"
+        await self.__session.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+
+        # Blocks the writes to the partition until it is dropped, so the counts stay accurate
+        await self.__session.execute(text(f"LOCK TABLE {partition} IN SHARE MODE"))
+        result = await self.__session.execute(
+            text(
+                f"""
+                SELECT
+                    count(*) AS requested,
+                    count(*) FILTER (WHERE is_downloaded) AS downloaded,
+                    count(*) FILTER (WHERE NOT is_downloaded AND expires_at > now()) AS redeemable
+                FROM {partition}
+                """,
+            ),
+        )
+        requested, downloaded, redeemable = result.one()
+
+        if redeemable:
+            await self.__session.rollback()
+            logger.info("Download partition still has redeemable links", partition=name, redeemable=redeemable)
+            return False
+
+        await DownloadRepo(session=self.__session).archive_statistics(requested=requested, downloaded=downloaded)
+
+        await self.__session.execute(text(f"ALTER TABLE {self.__table} DETACH PARTITION {partition}"))
+        await self.__session.execute(text(f"DROP TABLE {partition}"))
+        await self.__session.commit()
+
+        return True
@@ -1,9 +1,11 @@
+from code.cache import TtlCache
 from code.db import get_session
-from code.environment import SERVICE_NAME
-from code.eventbridge import EventBridge, get_eventbridge
-from code.models import DownloadCreate, DownloadResponse, DownloadStatistics
+from code.environment import DOWNLOAD_BATCH_MAX_SIZE, LEGACY_TOKENS_ENABLED, SERVICE_NAME, STATISTICS_CACHE_SECONDS
+from code.models import DownloadCreate, DownloadRequestResult, DownloadResponse, DownloadStatistics
 from code.repos.download import DownloadRepo
 from code.s3 import S3, get_s3
+from code.timing import query_budget
+from code.tokens import ExpiredTokenError, InvalidTokenError, load_signing_keys, verify_token
 from typing import Annotated
 from uuid import UUID
 
@@ -12,9 +14,14 @@ from fastapi import (
     APIRouter,
     Body,
     Depends,
+    HTTPException,
     Path,
+    Query,
+    Request,
+    Response,
     status,
 )
+from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -23,44 +30,140 @@ tracer = Tracer(service=SERVICE_NAME)
 
 router = APIRouter(prefix="/download")
 
+# Shared by the requests of the execution environment, see download_statistics
+statistics_cache: TtlCache[DownloadStatistics] = TtlCache(ttl_seconds=STATISTICS_CACHE_SECONDS)
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """Check the ETag against an If-None-Match header, which can list several, weak or not"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
+
+def parse_token(token: str) -> UUID:
+    """Get the download id of a link token, rejecting the forged and expired ones without any DB query
+
+    The plain UUID tokens of the links sent before the tokens were signed are accepted
+    while LEGACY_TOKENS_ENABLED is set, they expire TOKEN_EXPIRATION_HOURS after being sent.
+    """
+
+    try:
+        return verify_token(token)
+    except InvalidTokenError:
+        if LEGACY_TOKENS_ENABLED:
+            try:
+                return UUID(token)
+            except ValueError:
+                pass
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid link.") from None
+    except ExpiredTokenError:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Link expired.") from None
+
+
+def redirect_requested(redirect: bool | None, accept: str | None) -> bool:
+    """Tell whether to redirect to the book rather than return its URL as JSON
+
+    The redirect query parameter decides when given. Otherwise a browser following a link, which
+    asks for text/html, is redirected, while the frontend and API clients get the JSON.
+    """
+
+    if redirect is not None:
+        return redirect
+    return "text/html" in (accept or "")
+
 
 # The order of the routes is important
 # FastAPI processes routes in the order they are defined, so static paths should come first.
-@router.get("/statistics")
+@router.get("/statistics", response_model=DownloadStatistics, dependencies=[Depends(query_budget(1))])
 async def download_statistics(
     session: Annotated[AsyncSession, Depends(get_session)],
-    eventbridge: Annotated[EventBridge, Depends(get_eventbridge)],
-    s3: Annotated[S3, Depends(get_s3)],
-) -> DownloadStatistics:
-    """Get the statistics of number of requested and downloaded ebooks"""
+    request: Request,
+    response: Response,
+) -> DownloadStatistics | Response:
+    """Get the statistics of number of requested and downloaded ebooks
+
+    The statistics are cached in the process for STATISTICS_CACHE_SECONDS, concurrent requests
+    sharing a single query when they expire, and can be cached as long by the clients.
+    A matching If-None-Match is answered with 304 Not Modified.
+    """
 
-    repo = DownloadRepo(session=session, eventbridge=eventbridge, s3=s3)
-    return await repo.get_statistics()
+    repo = DownloadRepo(session=session)
+    statistics = await statistics_cache.get(repo.get_statistics)
 
+    headers = {
+        "ETag": f'"{statistics.requested}-{statistics.downloaded}"',
+        "Cache-Control": f"public, max-age={STATISTICS_CACHE_SECONDS}",
+    }
+    if etag_matches(headers["ETag"], request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-@router.get("/{token}", response_model=DownloadResponse)
+    response.headers.update(headers)
+    return statistics
+
+
+@router.post("/batch", dependencies=[Depends(query_budget(1)), Depends(load_signing_keys)])
+async def request_book_batch(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    body: Annotated[
+        list[DownloadCreate],
+        Body(description="Download requests, for example of workshop attendees", min_length=1, max_length=DOWNLOAD_BATCH_MAX_SIZE),
+    ],
+) -> list[DownloadRequestResult]:
+    """Request book copies in bulk
+
+    Each request is accepted or rejected on its own, following the same backoff as a single request.
+    """
+
+    repo = DownloadRepo(session=session)
+    return await repo.request_batch(new=body)
+
+
+@router.get(
+    "/{token}",
+    response_model=DownloadResponse,
+    responses={status.HTTP_302_FOUND: {"description": "Redirect to the presigned URL of the book"}},
+    dependencies=[Depends(query_budget(2)), Depends(load_signing_keys)],
+)
 async def download_book(
     session: Annotated[AsyncSession, Depends(get_session)],
-    eventbridge: Annotated[EventBridge, Depends(get_eventbridge)],
     s3: Annotated[S3, Depends(get_s3)],
-    token: Annotated[UUID, Path(description="Token to download the file")],
-) -> DownloadResponse:
-    """Exchange a token for a presigned URL to download the book"""
+    request: Request,
+    response: Response,
+    token: Annotated[str, Path(description="Token to download the file, from the link sent by email")],
+    redirect: Annotated[
+        bool | None,
+        Query(description="Redirect to the book instead of returning its URL, by default only when the client asks for HTML"),
+    ] = None,
+) -> DownloadResponse | RedirectResponse:
+    """Exchange a token for a presigned URL to download the book
+
+    The URL is only generated once the token is redeemed. In redirect mode the reply is a 302 to the URL,
+    so the links sent by email can point at this route and the browser starts the download right away.
+    Link scanners of mail providers following them would redeem the token, so it's opt-in with DOWNLOAD_LINK_URL.
+    """
 
-    repo = DownloadRepo(session=session, eventbridge=eventbridge, s3=s3)
-    download = await repo.get(token)
+    download_id = parse_token(token)
 
-    return DownloadResponse(url=download.presigned_url)
+    repo = DownloadRepo(session=session)
+    await repo.get(download_id)
 
+    url = await s3.get_ebook_presigned_url()
+    if redirect_requested(redirect, request.headers.get("accept")):
+        return RedirectResponse(url=url, status_code=status.HTTP_302_FOUND, headers={"Cache-Control": "no-store", "Vary": "Accept"})
 
-@router.post("", status_code=status.HTTP_201_CREATED)
+    # The reply depends on the Accept header, which caches must key on
+    response.headers["Vary"] = "Accept"
+    return DownloadResponse(url=url)
+
+
+@router.post("", status_code=status.HTTP_201_CREATED, dependencies=[Depends(query_budget(1)), Depends(load_signing_keys)])
 async def request_book(
     session: Annotated[AsyncSession, Depends(get_session)],
-    eventbridge: Annotated[EventBridge, Depends(get_eventbridge)],
-    s3: Annotated[S3, Depends(get_s3)],
     body: Annotated[DownloadCreate, Body(description="Download request details")],
 ) -> None:
     """Request a book copy by giving email and name"""
 
-    repo = DownloadRepo(session=session, eventbridge=eventbridge, s3=s3)
+    repo = DownloadRepo(session=session)
     await repo.request(new=body)
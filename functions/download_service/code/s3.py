@@ -1,49 +1,177 @@
-from code.environment import BUCKET_NAME, EBOOK_OBJECT_KEY, LOCALSTACK_ENDPOINT, SERVICE_NAME, TOKEN_EXPIRATION_HOURS
+import time
+import zlib
+from code.aws import get_client, run_in_executor
+from code.environment import (
+    ARCHIVE_PART_SIZE_BYTES,
+    BUCKET_NAME,
+    EBOOK_OBJECT_KEY,
+    PRESIGNED_URL_CACHE_SECONDS,
+    PRESIGNED_URL_EXPIRATION_SECONDS,
+    SERVICE_NAME,
+)
+from code.timing import record
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
-from typing import cast
+from types import TracebackType
+from typing import TYPE_CHECKING, Self, cast
 
-import boto3
 from aws_lambda_powertools import Logger
-from mypy_boto3_s3 import S3Client
+
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
 
 
 logger = Logger(service=SERVICE_NAME)
-session = boto3.Session()
+
+# Pre-signed URLs keyed by (object key, expiry bucket), shared by every S3 instance in the process
+presigned_urls: dict[tuple[str, int], str] = {}
+
+# S3 rejects multipart uploads whose parts, except the last one, are smaller than 5 MiB
+MIN_PART_SIZE_BYTES = 5 * 1024 * 1024
 
 
 class S3:
     """S3 client."""
 
     def __init__(self) -> None:
-        """Initialize S3.
+        """Initialize S3 with the shared s3 client."""
 
-        If LOCALSTACK_ENDPOINT is not defined, the client will be initialized with the default endpoint (AWS account).
+        self.client = cast("S3Client", get_client("s3"))
+
+    async def get_ebook_presigned_url(self) -> str:
+        """Get a pre-signed URL to download the ebook
+
+        Time is split in buckets of PRESIGNED_URL_CACHE_SECONDS and one URL is signed per bucket,
+        so redemptions within the same window reuse the same signature. The URL expires at the end
+        of its bucket plus PRESIGNED_URL_EXPIRATION_SECONDS, so every URL handed out is valid for at
+        least PRESIGNED_URL_EXPIRATION_SECONDS.
         """
 
-        self.client = cast(
-            S3Client,
-            session.client(
-                service_name="s3",
-                endpoint_url=LOCALSTACK_ENDPOINT,
-            ),
+        now = int(time.time())
+        expiry_bucket = now // PRESIGNED_URL_CACHE_SECONDS
+        cache_key = (EBOOK_OBJECT_KEY, expiry_bucket)
+
+        if cache_key not in presigned_urls:
+            bucket_end = (expiry_bucket + 1) * PRESIGNED_URL_CACHE_SECONDS
+            with record("s3"):
+                url = self.client.generate_presigned_url(
+                    "get_object",
+                    Params={
+                        "Bucket": BUCKET_NAME,
+                        "Key": EBOOK_OBJECT_KEY,
+                    },
+                    ExpiresIn=bucket_end - now + PRESIGNED_URL_EXPIRATION_SECONDS,
+                )
+            presigned_urls.clear()
+            presigned_urls[cache_key] = url
+            logger.info("Pre-signed URL generated", object_key=EBOOK_OBJECT_KEY, expiry_bucket=expiry_bucket)
+
+        return presigned_urls[cache_key]
+
+    def upload_gzip(self, key: str, part_size: int = ARCHIVE_PART_SIZE_BYTES) -> "GzipMultipartUpload":
+        """Get a gzip compressed multipart upload to the object key"""
+
+        return GzipMultipartUpload(client=self.client, key=key, part_size=part_size)
+
+
+class GzipMultipartUpload:
+    """Gzip compressed object streamed to S3 with a multipart upload
+
+    Written data is compressed on the fly and uploaded one part at a time, so memory use is bounded
+    by the part size whatever the size of the object. Used as an async context manager: the upload is
+    completed when the block exits normally and aborted when it raises.
+    """
+
+    def __init__(self, client: "S3Client", key: str, part_size: int = ARCHIVE_PART_SIZE_BYTES) -> None:
+        self.client = client
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE_BYTES)
+        self.compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+        self.buffer = bytearray()
+        self.parts: list[dict] = []
+        self.upload_id: str | None = None
+        self.size = 0
+
+    async def __aenter__(self) -> Self:
+        """Start the multipart upload"""
+        response = await run_in_executor(
+            self.client.create_multipart_upload,
+            Bucket=BUCKET_NAME,
+            Key=self.key,
+            ContentType="application/gzip",
         )
-        logger.info("S3 initialized.")
-
-    async def generate_ebook_presigned_url(self) -> str:
-        """Generate a pre-signed URL to download the file"""
-        return self.client.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": BUCKET_NAME,
-                "Key": EBOOK_OBJECT_KEY,
-            },
-            ExpiresIn=TOKEN_EXPIRATION_HOURS * 60 * 60 + 10,  # To seconds + 10 seconds
+        self.upload_id = response["UploadId"]
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Complete the upload, or abort it when the block raised, nothing was written or completing failed"""
+        if exc_type is None and self.size:
+            try:
+                await self.complete()
+            except Exception:
+                await self.abort()
+                raise
+        else:
+            await self.abort()
+
+    async def write(self, data: bytes) -> None:
+        """Compress the data, uploading a part whenever the buffer reaches the part size"""
+
+        self.size += len(data)
+        self.buffer += self.compressor.compress(data)
+        if len(self.buffer) >= self.part_size:
+            await self.__upload_part()
+
+    async def complete(self) -> None:
+        """Upload the last part and complete the upload"""
+
+        self.buffer += self.compressor.flush()
+        await self.__upload_part()
+
+        await run_in_executor(
+            self.client.complete_multipart_upload,
+            Bucket=BUCKET_NAME,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+        logger.info("Multipart upload completed", object_key=self.key, size=self.size, part_count=len(self.parts))
+
+    async def abort(self) -> None:
+        """Abort the upload, deleting its parts"""
+
+        await run_in_executor(
+            self.client.abort_multipart_upload,
+            Bucket=BUCKET_NAME,
+            Key=self.key,
+            UploadId=self.upload_id,
+        )
+        logger.info("Multipart upload aborted", object_key=self.key)
+
+    async def __upload_part(self) -> None:
+        """Upload the buffer as the next part"""
+
+        part_number = len(self.parts) + 1
+        response = await run_in_executor(
+            self.client.upload_part,
+            Bucket=BUCKET_NAME,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=bytes(self.buffer),
         )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self.buffer.clear()
 
 
 async def get_s3() -> AsyncGenerator[S3]:
-    """Get EventBridge instance."""
+    """Get S3 instance."""
     yield S3()
 
 
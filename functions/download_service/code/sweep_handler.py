@@ -0,0 +1,59 @@
+import asyncio
+from code.db import session_context
+from code.environment import SERVICE_NAME
+from code.repos.archive import DownloadArchiveRepo
+from code.repos.download import DownloadRepo
+from code.repos.partition import DownloadPartitionRepo
+from code.s3 import get_s3_context
+from typing import Any
+
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+
+logger = Logger(service=SERVICE_NAME)
+tracer = Tracer(service=SERVICE_NAME)
+
+# Input of the daily schedule, telling it apart from the keep warm events
+SWEEP_ACTION = "sweep"
+
+# Reused across invocations, so pooled connections stay bound to a live loop
+loop = asyncio.new_event_loop()
+
+
+@tracer.capture_method(capture_response=False)
+async def sweep() -> dict[str, Any]:
+    """Create the upcoming partitions of the downloads table, archive the expired downloads and drop their partitions
+
+    Also prunes the request throttles past the backoff window, which would otherwise keep one row per email forever.
+
+    Returns
+    -------
+        dict[str, Any]: the names of the created and dropped partitions, and the numbers of archived downloads and pruned throttles
+
+    """
+
+    async with session_context() as session, get_s3_context() as s3:
+        repo = DownloadPartitionRepo(session=session)
+        created = await repo.create_ahead()
+        archived_count = await DownloadArchiveRepo(session=session, s3=s3).archive()
+        dropped = await repo.sweep()
+        pruned_count = await DownloadRepo(session=session).prune_throttles()
+
+    return {"created": created, "archived": archived_count, "dropped": dropped, "pruned": pruned_count}
+
+
+@logger.inject_lambda_context(log_event=True)
+@tracer.capture_lambda_handler(capture_response=False)
+def handler(event: dict[str, Any], _context: LambdaContext) -> dict[str, Any] | None:
+    """AWS Lambda handler maintaining the partitions of the downloads table. Triggered by a daily schedule."""
+
+    if event.get("action") != SWEEP_ACTION:
+        logger.info("Keep warm event.")
+        return None
+
+    return loop.run_until_complete(sweep())
+
+
+if __name__ == "__main__":
+    loop.run_until_complete(sweep())
@@ -0,0 +1,121 @@
+import base64
+import binascii
+import datetime as dt
+import hashlib
+import hmac
+import struct
+import time
+from code.aws import run_in_executor
+from code.cache import TtlCache
+from code.environment import TOKEN_SECRET_MAX_AGE_SECONDS, TOKEN_SECRET_NAME
+from uuid import UUID
+
+
+# Signs the tokens when TOKEN_SECRET_NAME isn't set, e.g. with docker-compose
+LOCAL_TOKEN_SIGNING_KEY = b"local-token-signing-key"
+
+# The download id (16 bytes) and the expiry in Unix seconds (4 bytes), followed by the truncated HMAC-SHA256
+EXPIRY_FORMAT = struct.Struct(">I")
+PAYLOAD_BYTES = 16 + EXPIRY_FORMAT.size
+MAC_BYTES = 16
+TOKEN_LENGTH = len(base64.urlsafe_b64encode(bytes(PAYLOAD_BYTES + MAC_BYTES)))
+
+# Loaded off the event loop by load_signing_keys, see get_signing_keys
+signing_keys_cache: TtlCache[list[bytes]] = TtlCache(ttl_seconds=TOKEN_SECRET_MAX_AGE_SECONDS)
+
+# The keys loaded at the start of a request stay usable until it ends, even if they expire in between
+SIGNING_KEYS_STALE_SECONDS = 60
+
+
+class InvalidTokenError(Exception):
+    """The token is malformed or its signature doesn't match"""
+
+
+class ExpiredTokenError(Exception):
+    """The token is genuine but expired"""
+
+
+class SigningKeysNotLoadedError(RuntimeError):
+    """The token signing keys are missing or stale, load_signing_keys must be awaited first"""
+
+
+def fetch_signing_keys() -> list[bytes]:
+    """Get the token signing keys from Secrets Manager, a blocking call cached for TOKEN_SECRET_MAX_AGE_SECONDS
+
+    The secret holds comma separated keys: the first one signs, all of them verify, so a key can be
+    rotated by prepending the new one and dropping the old one once its tokens expired.
+    Unlike the DB credentials, there's no fallback when Secrets Manager fails, as it would sign with a public key.
+    """
+
+    if not TOKEN_SECRET_NAME:
+        return [LOCAL_TOKEN_SIGNING_KEY]
+
+    # Imports boto3, so it's deferred to the first token
+    from aws_lambda_powertools.utilities.parameters import get_secret
+
+    secret = get_secret(name=TOKEN_SECRET_NAME, max_age=TOKEN_SECRET_MAX_AGE_SECONDS)
+    return [key.strip().encode() for key in secret.split(",") if key.strip()]
+
+
+async def load_signing_keys() -> list[bytes]:
+    """Load the token signing keys in the AWS thread pool, refreshed every TOKEN_SECRET_MAX_AGE_SECONDS
+
+    The routes signing or verifying tokens depend on it, so Secrets Manager is never called on the event loop.
+    The other callers, e.g. scripts and tests, await it before building or verifying a token.
+    """
+    return await signing_keys_cache.get(lambda: run_in_executor(fetch_signing_keys))
+
+
+def get_signing_keys() -> list[bytes]:
+    """Get the token signing keys loaded by load_signing_keys
+
+    Raises
+    ------
+        SigningKeysNotLoadedError: the keys were never loaded, or expired more than SIGNING_KEYS_STALE_SECONDS ago
+
+    """
+
+    if (keys := signing_keys_cache.peek(stale_seconds=SIGNING_KEYS_STALE_SECONDS)) is None:
+        raise SigningKeysNotLoadedError
+    return keys
+
+
+def sign(key: bytes, payload: bytes) -> bytes:
+    """Compute the truncated HMAC-SHA256 of the payload"""
+    return hmac.new(key, payload, hashlib.sha256).digest()[:MAC_BYTES]
+
+
+def sign_token(download_id: UUID, expires_at: dt.datetime) -> str:
+    """Build the download token of a download, valid until its expiry"""
+
+    payload = download_id.bytes + EXPIRY_FORMAT.pack(int(expires_at.timestamp()))
+    return base64.urlsafe_b64encode(payload + sign(get_signing_keys()[0], payload)).decode()
+
+
+def verify_token(token: str) -> UUID:
+    """Return the download id of a token, checking its signature and expiry without any DB query
+
+    Raises
+    ------
+        InvalidTokenError: the token is malformed or forged
+        ExpiredTokenError: the token is expired
+
+    """
+
+    if len(token) != TOKEN_LENGTH:
+        raise InvalidTokenError
+
+    try:
+        raw = base64.urlsafe_b64decode(token)
+    except (binascii.Error, ValueError) as error:
+        raise InvalidTokenError from error
+
+    payload, mac = raw[:PAYLOAD_BYTES], raw[PAYLOAD_BYTES:]
+    if len(mac) != MAC_BYTES or not any(hmac.compare_digest(sign(key, payload), mac) for key in get_signing_keys()):
+        raise InvalidTokenError
+
+    (expires_at,) = EXPIRY_FORMAT.unpack(payload[16:])
+    if expires_at <= time.time():
+        raise ExpiredTokenError
+
+    return UUID(bytes=payload[:16])
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from code.aws import run_in_executor
+from code.db import engine, get_db_secret, reader_engine, session_context
+from code.environment import SERVICE_NAME
+from code.models.base import uuid7
+from code.repos.download import DownloadRepo
+from code.s3 import S3
+from code.timing import Timings, current_timings, record
+from code.tokens import load_signing_keys
+from contextlib import suppress
+from typing import Any
+
+from aws_lambda_powertools import Logger
+from fastapi import HTTPException
+from sqlalchemy import text
+
+
+logger = Logger(service=SERVICE_NAME)
+
+
+async def prime_aws_clients() -> None:
+    """Build the S3 client and sign the ebook URL, which loads the credentials"""
+    with record("aws_clients"):
+        await S3().get_ebook_presigned_url()
+
+
+async def prime_secrets() -> None:
+    """Fetch the DB credentials and the token signing keys into their caches"""
+    with record("secrets"):
+        await run_in_executor(get_db_secret)
+        await load_signing_keys()
+
+
+async def prime_db() -> None:
+    """Open and validate a pooled connection to the writer and the reader, then run the hot statements once
+
+    SQLAlchemy and asyncpg then have their compiled and prepared forms cached. The token redemption
+    runs with an unknown token, so nothing is written.
+    """
+
+    for target in (engine, reader_engine):
+        async with target.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async with session_context() as session:
+        repo = DownloadRepo(session=session)
+        await repo.get_statistics()
+        with suppress(HTTPException):
+            await repo.get(uuid7())
+
+
+async def prime() -> dict[str, Any]:
+    """Pay the first-use costs of the API before a request does
+
+    A failed step is logged and the next ones still run.
+
+    Returns
+    -------
+        dict[str, Any]: the duration of each step in milliseconds, with the number of DB statements
+
+    """
+
+    timings = Timings()
+    token = current_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        for step in (prime_aws_clients, prime_secrets, prime_db):
+            try:
+                await step()
+            except Exception:
+                logger.exception("Priming step failed", step=step.__name__)
+    finally:
+        current_timings.reset(token)
+
+    return {"total_ms": round((time.perf_counter() - start) * 1000, 1), **timings.log_fields()}
+
+
+def warm_up() -> dict[str, Any] | None:
+    """Prime the execution environment on the event loop serving the requests, logging how long it took
+
+    A failure is logged rather than raised: the requests then pay the first-use costs themselves.
+    """
+
+    try:
+        durations = asyncio.get_event_loop().run_until_complete(prime())
+    except Exception:
+        logger.exception("Priming failed")
+        return None
+
+    logger.info("Primed", **durations)
+    return durations
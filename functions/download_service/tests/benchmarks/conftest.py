@@ -0,0 +1,10 @@
+from code import db
+
+import pytest
+
+
+@pytest.fixture()
+def session(run):
+    session = db.async_session()
+    yield session
+    run(session.close())
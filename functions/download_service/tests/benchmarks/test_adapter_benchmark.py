@@ -0,0 +1,34 @@
+import importlib
+import json
+import sys
+from code import environment
+from pathlib import Path
+
+import pytest
+
+
+EVENTS = sorted((Path(__file__).parent.parent / "events").glob("http_api_*.json"))
+
+
+def load_api_handler(adapter):
+    """Import a fresh code.api_handler configured for the given adapter"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(environment, "API_ADAPTER", adapter)
+        sys.modules.pop("code.api_handler", None)
+        return importlib.import_module("code.api_handler")
+
+
+@pytest.fixture(scope="module", params=["mangum", "http_api"])
+def asgi_handler(request):
+    return load_api_handler(request.param).asgi_handler
+
+
+@pytest.mark.parametrize("event_file", EVENTS, ids=lambda path: path.stem)
+def test_adapter_invocation(benchmark, asgi_handler, event_file):
+    event = json.loads(event_file.read_text())
+    benchmark.group = event_file.stem
+
+    response = benchmark(asgi_handler, event, None)
+
+    # None of the events reach the database: the invalid token is rejected before the lookup
+    assert response["statusCode"] in {200, 404, 422}
@@ -0,0 +1,57 @@
+import datetime as dt
+import uuid
+from code import db
+from code.models.base import uuid7
+
+import pytest
+from sqlalchemy import text
+
+
+# Rows seeded in each table before measuring, so the primary key index is larger than a few pages
+SEED_ROWS = 200_000
+BATCH_SIZE = 1_000
+
+GENERATORS = {"uuid4": lambda _: uuid.uuid4(), "uuid7": uuid7}
+
+
+def ids(version, count, start):
+    """Generate count ids of a version, the UUIDv7 ones a millisecond apart from start"""
+    return [GENERATORS[version](start + dt.timedelta(milliseconds=index)) for index in range(count)]
+
+
+@pytest.fixture(scope="module", params=GENERATORS)
+def table(request, run, database):  # noqa: ARG001
+    """A table with a UUID primary key seeded with SEED_ROWS ids of the version"""
+
+    version = request.param
+    name = f"public.benchmark_{version}"
+
+    async def seed():
+        async with db.engine.begin() as connection:
+            await connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            await connection.execute(text(f"CREATE TABLE {name} (id uuid PRIMARY KEY, created_at timestamptz NOT NULL DEFAULT now())"))
+            start = dt.datetime.now(dt.UTC) - dt.timedelta(days=30)
+            await connection.execute(
+                text(f"INSERT INTO {name} (id) SELECT unnest(CAST(:ids AS uuid[]))"),
+                {"ids": ids(version, SEED_ROWS, start)},
+            )
+
+    run(seed())
+    return version, name
+
+
+def test_insert_throughput(benchmark, run, table):
+    """Insert batches of new ids, UUIDv4 ones land on random pages of the index, UUIDv7 ones on the last"""
+
+    version, name = table
+    benchmark.group = "Insert ids"
+
+    def setup():
+        return (ids(version, BATCH_SIZE, dt.datetime.now(dt.UTC)),), {}
+
+    async def insert(batch):
+        async with db.engine.begin() as connection:
+            await connection.execute(text(f"INSERT INTO {name} (id) SELECT unnest(CAST(:ids AS uuid[]))"), {"ids": batch})
+
+    # The ids are generated in the setup, so only the inserts are measured
+    benchmark.pedantic(lambda batch: run(insert(batch)), setup=setup, rounds=50, warmup_rounds=2)
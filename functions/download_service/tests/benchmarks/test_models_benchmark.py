@@ -0,0 +1,36 @@
+from code.models import Download, DownloadCreate
+from code.tokens import verify_token
+
+import pytest
+
+
+PAYLOAD = {"email": "reader@example.com", "name": "Reader"}
+
+
+@pytest.fixture(scope="module")
+def record():
+    return Download(**PAYLOAD)
+
+
+def test_download_construction(benchmark):
+    benchmark.group = "Download"
+
+    record = benchmark(lambda: Download(**PAYLOAD))
+
+    assert verify_token(record.link.rsplit("/", 1)[-1]) == record.id
+
+
+def test_download_create_validation(benchmark):
+    benchmark.group = "Download"
+
+    new = benchmark(DownloadCreate.model_validate, PAYLOAD)
+
+    assert new.email == PAYLOAD["email"]
+
+
+def test_download_serialization(benchmark, record):
+    benchmark.group = "Download"
+
+    detail = benchmark(record.model_dump_json)
+
+    assert str(record.id) in detail
@@ -0,0 +1,47 @@
+import itertools
+from code.models import DownloadCreate
+from code.repos.download import DownloadRepo
+
+import pytest
+
+
+emails = (f"benchmark-{index}@example.com" for index in itertools.count())
+
+
+def new_download():
+    """A download request for an email that was never throttled"""
+    return DownloadCreate(email=next(emails), name="Benchmark")
+
+
+@pytest.fixture()
+def repo(session):
+    return DownloadRepo(session=session)
+
+
+def test_request(benchmark, run, repo):
+    benchmark.group = "DownloadRepo"
+
+    record = benchmark(lambda: run(repo.request(new=new_download())))
+
+    assert record.email.startswith("benchmark-")
+
+
+def test_get(benchmark, run, repo):
+    benchmark.group = "DownloadRepo"
+
+    def setup():
+        record = run(repo.request(new=new_download()))
+        return (record.id,), {}
+
+    record = benchmark.pedantic(lambda token: run(repo.get(token)), setup=setup, rounds=200)
+
+    assert record.is_downloaded
+
+
+def test_get_statistics(benchmark, run, repo):
+    benchmark.group = "DownloadRepo"
+    run(repo.request(new=new_download()))
+
+    statistics = benchmark(lambda: run(repo.get_statistics()))
+
+    assert statistics.requested > 0
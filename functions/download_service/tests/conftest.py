@@ -0,0 +1,152 @@
+import asyncio
+import math
+from code import db, tokens
+from code.cache import TtlCache
+from code.environment import BUCKET_NAME
+from code.eventbridge import EventBridge
+from code.s3 import S3
+
+import boto3
+import pytest
+from alembic import command
+from alembic.config import Config
+from moto import mock_aws
+from moto.server import ThreadedMotoServer
+from pytest_postgresql import factories
+from sqlalchemy import text
+
+
+# Disposable server for the tests and benchmarks running against a database, see --postgresql-exec to point at the pg_ctl binary
+postgresql_proc = factories.postgresql_proc()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def signing_keys():
+    """Load the token signing keys once, for the tests building or verifying tokens outside of the routes"""
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(tokens, "signing_keys_cache", TtlCache(ttl_seconds=math.inf))
+
+        loop = asyncio.new_event_loop()
+        try:
+            yield loop.run_until_complete(tokens.load_signing_keys())
+        finally:
+            loop.close()
+
+
+@pytest.fixture(scope="session")
+def database(request):
+    """Start a disposable Postgres migrated to head, used by code.db as its local database
+
+    The tests and benchmarks using it are skipped when the PostgreSQL binaries aren't installed.
+    """
+
+    try:
+        proc = request.getfixturevalue("postgresql_proc")
+    except Exception as error:  # noqa: BLE001
+        pytest.skip(f"PostgreSQL is not available: {error}")
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(db, "is_local_db", True)
+        monkeypatch.setitem(db.LOCAL_DB_SECRET, "host", proc.host)
+        monkeypatch.setitem(db.LOCAL_DB_SECRET, "port", proc.port)
+        monkeypatch.setitem(db.LOCAL_DB_SECRET, "username", proc.user)
+        monkeypatch.setitem(db.LOCAL_DB_SECRET, "password", proc.password or None)
+
+        # The migrations look the current loop up, which the asyncio tests leave unset
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        command.upgrade(Config("alembic.ini"), "head")
+        yield proc
+
+
+@pytest.fixture(scope="session")
+def run(database):  # noqa: ARG001
+    """Run a coroutine to completion on the loop the pooled connections are bound to"""
+
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.run_until_complete(db.engine.dispose())
+    loop.close()
+
+
+@pytest.fixture()
+def in_session(run):
+    """Run a coroutine function with a session of the test database, returning its result"""
+
+    def run_in_session(function):
+        async def call():
+            async with db.session_context() as session:
+                return await function(session)
+
+        return run(call())
+
+    return run_in_session
+
+
+@pytest.fixture()
+def execute(in_session):
+    """Run SQL statements in one transaction of the test database"""
+
+    async def execute_all(session, statements):
+        for statement in statements:
+            await session.execute(text(statement) if isinstance(statement, str) else statement)
+        await session.commit()
+
+    return lambda *statements: in_session(lambda session: execute_all(session, statements))
+
+
+@pytest.fixture()
+def fetch(in_session):
+    """Return the rows of a SQL query on the test database"""
+
+    async def fetch_all(session, statement):
+        result = await session.execute(text(statement) if isinstance(statement, str) else statement)
+        return result.all()
+
+    return lambda statement: in_session(lambda session: fetch_all(session, statement))
+
+
+@pytest.fixture()
+def counter_totals(fetch):
+    """Return the sums of the requested and downloaded counter shards"""
+    return lambda: tuple(fetch("SELECT sum(requested), sum(downloaded) FROM download.download_counters")[0])
+
+
+@pytest.fixture()
+def s3():
+    """S3 client on a mocked bucket"""
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET_NAME)
+
+        s3 = S3()
+        s3.client = client
+        yield s3
+
+
+@pytest.fixture(scope="session")
+def moto_endpoint():
+    """Start an in-process moto server for the AWS calls"""
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture()
+def eventbridge(moto_endpoint):
+    """EventBridge client putting the events to the moto server"""
+
+    client = boto3.client(
+        "events",
+        endpoint_url=moto_endpoint,
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    eventbridge = EventBridge()
+    eventbridge.client = client
+    return eventbridge
@@ -0,0 +1,91 @@
+import importlib
+import json
+import sys
+from code import environment
+from code.adapter import HttpApiAdapter
+from pathlib import Path
+
+import pytest
+from mangum import Mangum
+
+
+EVENTS = sorted((Path(__file__).parent / "events").glob("http_api_*.json"))
+
+
+def load_api_handler(adapter):
+    """Import a fresh code.api_handler configured for the given adapter"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(environment, "API_ADAPTER", adapter)
+        sys.modules.pop("code.api_handler", None)
+        return importlib.import_module("code.api_handler")
+
+
+@pytest.fixture(scope="module")
+def handlers():
+    mangum = load_api_handler("mangum")
+    http_api = load_api_handler("http_api")
+    assert isinstance(mangum.asgi_handler, Mangum)
+    return mangum.asgi_handler, http_api.asgi_handler
+
+
+@pytest.mark.parametrize("event_file", EVENTS, ids=lambda path: path.stem)
+def test_http_api_adapter_matches_mangum(handlers, event_file):
+    mangum, http_api = handlers
+    event = json.loads(event_file.read_text())
+
+    expected = mangum(event, None)
+    response = http_api(event, None)
+
+    assert response["statusCode"] == expected["statusCode"]
+    assert json.loads(response["body"]) == json.loads(expected["body"])
+    assert response["headers"]["content-type"] == expected["headers"]["content-type"]
+    # The API Gateway sets the CORS headers
+    assert "access-control-allow-origin" in expected["headers"]
+    assert "access-control-allow-origin" not in response["headers"]
+
+
+def test_http_api_adapter_starts_lifespan_once(handlers):
+    _, http_api = handlers
+    event = json.loads((Path(__file__).parent / "events" / "http_api_health.json").read_text())
+
+    http_api(event, None)
+    lifespan = http_api.lifespan
+    http_api(event, None)
+
+    assert http_api.lifespan is lifespan
+    assert not lifespan.done()
+
+
+async def failing_app(scope, receive, send):  # noqa: ARG001
+    if scope["type"] == "http":
+        msg = "Failed before responding"
+        raise RuntimeError(msg)
+
+
+async def app_failing_after_response(scope, receive, send):  # noqa: ARG001
+    if scope["type"] == "http":
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+        msg = "Failed in a background task"
+        raise RuntimeError(msg)
+
+
+def test_http_api_adapter_returns_500_when_the_app_fails():
+    event = json.loads((Path(__file__).parent / "events" / "http_api_health.json").read_text())
+
+    expected = Mangum(failing_app, lifespan="off")(event, None)
+    response = HttpApiAdapter(failing_app)(event, None)
+
+    assert response["statusCode"] == expected["statusCode"] == 500
+    assert response["body"] == expected["body"] == "Internal Server Error"
+    assert response["headers"]["content-type"] == "text/plain; charset=utf-8"
+    assert not response["isBase64Encoded"]
+
+
+def test_http_api_adapter_keeps_the_response_when_the_app_fails_after_it():
+    event = json.loads((Path(__file__).parent / "events" / "http_api_health.json").read_text())
+
+    response = HttpApiAdapter(app_failing_after_response)(event, None)
+
+    assert response["statusCode"] == 200
+    assert response["body"] == "{}"
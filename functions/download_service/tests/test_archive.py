@@ -0,0 +1,101 @@
+import datetime as dt
+import gzip
+import json
+from code.environment import ARCHIVE_PREFIX, BUCKET_NAME
+from code.models import Download, DownloadCounter
+from code.models.download_counter import ARCHIVED_SHARD
+from code.repos.archive import DownloadArchiveRepo
+
+import pytest
+from botocore.exceptions import ClientError
+from sqlalchemy import delete
+from sqlmodel import col, select
+
+
+NOW = dt.datetime.now(dt.UTC)
+OLD = NOW - dt.timedelta(days=400)
+EXPIRED = NOW - dt.timedelta(days=1)
+
+
+@pytest.fixture()
+def downloads(execute, in_session, monkeypatch):
+    """Downloads past and within the retention, archived and deleted one row per chunk and batch
+
+    Returns the ids of the downloads to archive and of the ones to keep.
+    """
+
+    monkeypatch.setattr("code.repos.archive.ARCHIVE_CHUNK_SIZE", 1)
+    monkeypatch.setattr("code.repos.archive.ARCHIVE_DELETE_BATCH_SIZE", 1)
+    execute(delete(Download))
+
+    archived = [
+        Download(email="reader1@example.com", name="Reader", created_at=OLD, expires_at=EXPIRED),
+        Download(email="reader2@example.com", name="Reader", created_at=OLD, expires_at=EXPIRED, is_downloaded=True),
+        Download(email="reader3@example.com", name="Reader", created_at=OLD, expires_at=EXPIRED),
+    ]
+    kept = [
+        # Within the retention
+        Download(email="reader4@example.com", name="Reader", expires_at=EXPIRED),
+        # Still redeemable
+        Download(email="reader5@example.com", name="Reader", created_at=OLD),
+    ]
+
+    async def add(session):
+        session.add_all(archived + kept)
+        await session.commit()
+        return {record.id for record in archived}, {record.id for record in kept}
+
+    return in_session(add)
+
+
+def archive(in_session, s3):
+    return in_session(lambda session: DownloadArchiveRepo(session=session, s3=s3).archive(retention_days=365))
+
+
+def archived_counts(fetch):
+    shard = select(DownloadCounter.requested, DownloadCounter.downloaded).where(DownloadCounter.shard == ARCHIVED_SHARD)
+    return fetch(shard) or [(0, 0)]
+
+
+def stored_ids(fetch):
+    return {download_id for (download_id,) in fetch(select(col(Download.id)))}
+
+
+def test_archive_uploads_and_deletes_the_old_expired_downloads(in_session, fetch, counter_totals, s3, downloads):
+    archived_ids, kept_ids = downloads
+    totals = counter_totals()
+    [(archived_requested, archived_downloaded)] = archived_counts(fetch)
+
+    assert archive(in_session, s3) == 3
+
+    [archive_object] = s3.client.list_objects_v2(Bucket=BUCKET_NAME)["Contents"]
+    assert archive_object["Key"].startswith(f"{ARCHIVE_PREFIX}/{NOW:%Y/%m/%d}/downloads-")
+    body = s3.client.get_object(Bucket=BUCKET_NAME, Key=archive_object["Key"])["Body"].read()
+    lines = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+    assert {line["id"] for line in lines} == {str(download_id) for download_id in archived_ids}
+    assert {line["email"] for line in lines} == {"reader1@example.com", "reader2@example.com", "reader3@example.com"}
+    assert all(dt.datetime.fromisoformat(line["created_at"]) == OLD for line in lines)
+
+    assert stored_ids(fetch) == kept_ids
+    assert counter_totals() == totals
+    assert archived_counts(fetch) == [(archived_requested + 3, archived_downloaded + 1)]
+
+
+def test_failed_archive_upload_is_aborted_and_deletes_nothing(in_session, fetch, counter_totals, s3, downloads, monkeypatch):
+    archived_ids, kept_ids = downloads
+    totals = counter_totals()
+    archived = archived_counts(fetch)
+
+    def upload_part(**_):
+        raise ClientError({"Error": {"Code": "InternalError", "Message": "We encountered an internal error"}}, "UploadPart")
+
+    monkeypatch.setattr(s3.client, "upload_part", upload_part)
+
+    with pytest.raises(ClientError):
+        archive(in_session, s3)
+
+    assert "Uploads" not in s3.client.list_multipart_uploads(Bucket=BUCKET_NAME)
+    assert "Contents" not in s3.client.list_objects_v2(Bucket=BUCKET_NAME)
+    assert stored_ids(fetch) == archived_ids | kept_ids
+    assert counter_totals() == totals
+    assert archived_counts(fetch) == archived
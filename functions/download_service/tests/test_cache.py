@@ -0,0 +1,85 @@
+import asyncio
+import json
+from code.adapter import HttpApiAdapter
+from code.cache import TtlCache
+from code.models import DownloadStatistics
+from code.repos.download import DownloadRepo
+from code.routes import download
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+
+
+EVENT = json.loads((Path(__file__).parent / "events" / "http_api_health.json").read_text())
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_callers_share_one_load():
+    cache = TtlCache(ttl_seconds=60)
+    loads = []
+
+    async def load():
+        loads.append(None)
+        await asyncio.sleep(0.01)
+        return len(loads)
+
+    values = await asyncio.gather(*(cache.get(load) for _ in range(10)))
+
+    assert values == [1] * 10
+    assert await cache.get(load) == 1
+    cache.clear()
+    assert await cache.get(load) == 2
+
+
+@pytest.mark.asyncio()
+async def test_failed_load_is_not_cached():
+    cache = TtlCache(ttl_seconds=60)
+
+    async def fail():
+        raise RuntimeError
+
+    async def load():
+        return 1
+
+    with pytest.raises(RuntimeError):
+        await cache.get(fail)
+    assert await cache.get(load) == 1
+
+
+@pytest.fixture()
+def statistics_handler(monkeypatch):
+    queries = []
+
+    async def get_statistics(_self):
+        queries.append(None)
+        return DownloadStatistics(requested=3, downloaded=2)
+
+    monkeypatch.setattr(DownloadRepo, "get_statistics", get_statistics)
+    monkeypatch.setattr(download, "statistics_cache", TtlCache(ttl_seconds=60))
+
+    api = FastAPI()
+    api.include_router(download.router)
+
+    def handler(headers):
+        path = "/download/statistics"
+        event = {**EVENT, "rawPath": path, "headers": {**EVENT["headers"], **headers}}
+        event["requestContext"] = {**EVENT["requestContext"], "http": {**EVENT["requestContext"]["http"], "path": path}}
+        return HttpApiAdapter(api)(event, None)
+
+    handler.queries = queries
+    return handler
+
+
+def test_statistics_not_modified(statistics_handler):
+    response = statistics_handler({})
+
+    assert json.loads(response["body"]) == {"requested": 3, "downloaded": 2}
+    assert response["headers"]["cache-control"] == "public, max-age=30"
+    etag = response["headers"]["etag"]
+
+    response = statistics_handler({"if-none-match": f"W/{etag}"})
+
+    assert response["statusCode"] == 304
+    assert response["headers"]["etag"] == etag
+    assert len(statistics_handler.queries) == 1
@@ -0,0 +1,107 @@
+from code import db
+from dataclasses import replace
+
+import asyncpg
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+@pytest.mark.asyncio()
+async def test_connect_refreshes_rotated_password(monkeypatch):
+    fetches = []
+
+    def get_secret(**kwargs):
+        fetches.append(kwargs["force_fetch"])
+        password = "rotated" if kwargs["force_fetch"] else "stale"
+        return {"dbname": "postgres", "username": "postgres", "password": password, "host": "db", "port": 5432}
+
+    async def open_connection(db_secret):
+        if db_secret["password"] == "stale":
+            raise asyncpg.InvalidPasswordError
+        return db_secret["password"]
+
+    monkeypatch.setattr("aws_lambda_powertools.utilities.parameters.get_secret", get_secret)
+    monkeypatch.setattr(db, "open_connection", open_connection)
+    monkeypatch.setattr(db, "is_local_db", False)
+
+    assert await db.connect() == "rotated"
+    assert fetches == [False, True]
+
+
+def test_redact_parameters():
+    assert db.redact_parameters(("reader@example.com", 3), executemany=False) == ["str", "int"]
+    assert db.redact_parameters({"email": "reader@example.com"}, executemany=False) == {"email": "str"}
+    assert db.redact_parameters([("reader@example.com",), ("writer@example.com",)], executemany=True) == "2 parameter sets"
+
+
+@pytest.mark.asyncio()
+async def test_read_only_methods_use_the_reader_until_the_session_writes(monkeypatch):
+    reader_engine = create_async_engine("postgresql+asyncpg://reader/postgres")
+    monkeypatch.setattr(db, "reader_engine", reader_engine)
+    session = db.RoutingSession()
+
+    @db.read_only
+    async def get_bind():
+        return session.get_bind()
+
+    assert await get_bind() is reader_engine.sync_engine
+    assert session.get_bind() is db.engine.sync_engine
+    assert await get_bind() is db.engine.sync_engine
+
+
+def test_driver_presets(monkeypatch):
+    assert db.get_driver_options().server_settings() == {
+        "application_name": "download-service",
+        "statement_timeout": "0",
+        "jit": "off",
+    }
+
+    monkeypatch.setattr(db, "DB_DRIVER_PRESET", "proxy")
+    monkeypatch.setattr(db, "DB_STATEMENT_CACHE_SIZE", "20")
+    options = db.get_driver_options()
+
+    assert options.statement_cache_size == 20
+    assert options.unique_statement_names
+    assert options.server_settings() == {"application_name": "download-service"}
+
+    monkeypatch.setattr(db, "DB_DRIVER_PRESET", "pgbouncer")
+    with pytest.raises(ValueError, match="Invalid DB_DRIVER_PRESET"):
+        db.get_driver_options()
+
+
+@pytest.fixture()
+def with_driver_options(run, monkeypatch):
+    """Reconnect with other driver options"""
+
+    def reconnect(**changes):
+        monkeypatch.setattr(db, "driver_options", replace(db.driver_options, **changes))
+        run(db.engine.dispose())
+
+    yield reconnect
+    run(db.engine.dispose())
+
+
+def query(run, statement):
+    async def execute():
+        async with db.session_context() as session:
+            return (await session.execute(text(statement))).all()
+
+    return run(execute())
+
+
+def test_driver_options_reach_the_session(run, with_driver_options):
+    with_driver_options(statement_timeout_ms=1500)
+
+    settings = query(run, "SELECT current_setting('application_name'), current_setting('statement_timeout'), current_setting('jit')")
+
+    assert settings == [("download-service", "1500ms", "off")]
+
+
+def test_proxy_preset_names_statements_uniquely(run, with_driver_options):
+    with_driver_options(**db.DRIVER_PRESETS["proxy"])
+
+    names = query(run, "SELECT name FROM pg_prepared_statements")
+
+    assert names
+    assert all(name.startswith("__asyncpg_") and len(name) > 40 for (name,) in names)
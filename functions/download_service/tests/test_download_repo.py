@@ -0,0 +1,145 @@
+import asyncio
+import datetime as dt
+from code import db
+from code.environment import BACKOFF_SECONDS
+from code.models import Download, DownloadCounter, DownloadCreate, OutboxEvent, RequestThrottle
+from code.models.base import uuid7
+from code.models.download_counter import ARCHIVED_SHARD
+from code.reconcile_counters import reconcile
+from code.repos.download import DownloadRepo
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import col, select
+
+
+@pytest.fixture()
+def add_download(execute, in_session):
+    """Empty the downloads, throttles and outbox, then add downloads straight to the table"""
+
+    execute(delete(Download), delete(RequestThrottle), delete(OutboxEvent))
+
+    async def add(session, record):
+        session.add(record)
+        await session.commit()
+        return record.id
+
+    return lambda **fields: in_session(lambda session: add(session, Download(email="reader@example.com", name="Reader", **fields)))
+
+
+def redeem(in_session, token):
+    return in_session(lambda session: DownloadRepo(session=session).get(token))
+
+
+def redeem_error(in_session, token) -> tuple[int, str]:
+    with pytest.raises(HTTPException) as error:
+        redeem(in_session, token)
+    return error.value.status_code, error.value.detail
+
+
+def test_get_redeems_the_token(in_session, fetch, counter_totals, add_download):
+    token = add_download()
+    requested, downloaded = counter_totals()
+
+    record = redeem(in_session, token)
+
+    assert record.id == token
+    assert record.is_downloaded
+    assert record.downloaded_at
+    stored = select(Download.is_downloaded, col(Download.downloaded_at).is_not(None)).where(Download.id == token)
+    assert fetch(stored) == [(True, True)]
+    assert counter_totals() == (requested, downloaded + 1)
+    assert fetch("SELECT detail_type FROM download.outbox_events") == [("book.downloaded",)]
+
+
+def test_get_rejects_a_used_token(in_session, add_download):
+    token = add_download(is_downloaded=True, downloaded_at=dt.datetime.now(dt.UTC))
+
+    assert redeem_error(in_session, token) == (403, "Link already used.")
+
+
+def test_get_rejects_an_expired_token(in_session, add_download):
+    token = add_download(expires_at=dt.datetime.now(dt.UTC) - dt.timedelta(seconds=1))
+
+    assert redeem_error(in_session, token) == (403, "Link expired.")
+
+
+@pytest.mark.usefixtures("add_download")
+def test_get_rejects_an_unknown_token(in_session):
+    assert redeem_error(in_session, uuid7()) == (404, "Invalid link.")
+
+
+def test_concurrent_redemptions_of_a_token_succeed_once(run, counter_totals, add_download):
+    token = add_download()
+    _, downloaded = counter_totals()
+
+    async def redeem_once():
+        async with db.session_context() as session:
+            return await DownloadRepo(session=session).get(token)
+
+    async def redeem_twice():
+        return await asyncio.gather(redeem_once(), redeem_once(), return_exceptions=True)
+
+    results = run(redeem_twice())
+
+    assert sum(isinstance(result, Download) for result in results) == 1
+    [error] = [result for result in results if isinstance(result, HTTPException)]
+    assert (error.status_code, error.detail) == (403, "Link already used.")
+    assert counter_totals()[1] == downloaded + 1
+
+
+def request(in_session, email="reader@example.com"):
+    return in_session(lambda session: DownloadRepo(session=session).request(DownloadCreate(email=email, name="Reader")))
+
+
+@pytest.mark.usefixtures("add_download")
+def test_request_rejects_a_repeat_request_inside_the_backoff(in_session, fetch):
+    record = request(in_session)
+
+    with pytest.raises(HTTPException) as error:
+        request(in_session)
+
+    assert error.value.status_code == 403
+    assert "try again in" in error.value.detail
+    assert fetch(select(col(Download.id))) == [(record.id,)]
+    assert fetch("SELECT detail_type FROM download.outbox_events") == [("book.requested",)]
+
+
+@pytest.mark.usefixtures("add_download")
+def test_prune_throttles_deletes_the_rows_past_the_backoff(in_session, execute, fetch):
+    past = dt.datetime.now(dt.UTC) - dt.timedelta(seconds=BACKOFF_SECONDS + 1)
+    execute(
+        pg_insert(RequestThrottle).values(
+            [
+                {"email": "past@example.com", "requested_at": past},
+                {"email": "recent@example.com", "requested_at": dt.datetime.now(dt.UTC)},
+            ],
+        ),
+    )
+
+    assert in_session(lambda session: DownloadRepo(session=session).prune_throttles()) == 1
+
+    assert fetch(select(RequestThrottle.email)) == [("recent@example.com",)]
+
+
+def test_reconcile_rebuilds_the_counters_from_the_downloads(run, execute, fetch, counter_totals, add_download):
+    for is_downloaded in (False, True, True):
+        add_download(is_downloaded=is_downloaded)
+    execute(
+        pg_insert(DownloadCounter).values(shard=ARCHIVED_SHARD, requested=7, downloaded=2).on_conflict_do_nothing(),
+        "UPDATE download.download_counters SET requested = requested + 100, downloaded = downloaded - 1 WHERE shard >= 0",
+        pg_insert(DownloadCounter).values(shard=5, requested=13, downloaded=13).on_conflict_do_nothing(),
+    )
+    archived = fetch(select(DownloadCounter.requested, DownloadCounter.downloaded).where(DownloadCounter.shard == ARCHIVED_SHARD))
+
+    statistics = run(reconcile())
+
+    [(archived_requested, archived_downloaded)] = archived
+    assert (statistics.requested, statistics.downloaded) == (archived_requested + 3, archived_downloaded + 2)
+    assert counter_totals() == (statistics.requested, statistics.downloaded)
+    assert fetch("SELECT shard, requested, downloaded FROM download.download_counters ORDER BY shard") == [
+        (ARCHIVED_SHARD, archived_requested, archived_downloaded),
+        (0, 3, 2),
+    ]
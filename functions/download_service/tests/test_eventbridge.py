@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+import pytest
+
+
+CONCURRENT_EVENTS = 8
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_put_events_overlap(eventbridge):
+    # Warm up the client so the calls below don't serialize on loading the service model
+    await eventbridge.put_event(prefix="test", type="warmup", detail="{}", source="tests")
+
+    # Each call waits until all of them are in flight, which breaks the barrier if they run one after the other
+    in_flight = threading.Barrier(CONCURRENT_EVENTS, timeout=5)
+
+    def wait_for_all(**_):
+        in_flight.wait()
+
+    eventbridge.client.meta.events.register("before-send.events.PutEvents", wait_for_all)
+
+    event_ids = await asyncio.gather(
+        *[
+            eventbridge.put_event(prefix="test", type="concurrent", detail=f'{{"index": {index}}}', source="tests")
+            for index in range(CONCURRENT_EVENTS)
+        ],
+    )
+
+    assert len(set(event_ids)) == CONCURRENT_EVENTS
@@ -0,0 +1,22 @@
+import datetime as dt
+import uuid
+from code.models import Download
+from code.models.base import uuid7, uuid7_timestamp
+
+
+def test_uuid7():
+    timestamp = dt.datetime(2026, 10, 17, 13, 0, 0, 123456, tzinfo=dt.UTC)
+
+    value = uuid7(timestamp)
+
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert uuid7_timestamp(value) == timestamp.replace(microsecond=123000)
+    assert uuid7(timestamp + dt.timedelta(milliseconds=1)) > value
+    assert uuid7_timestamp(uuid.uuid4()) is None
+
+
+def test_download_id_carries_created_at():
+    record = Download(email="reader@example.com", name="Reader")
+
+    assert uuid7_timestamp(record.id) <= record.created_at < uuid7_timestamp(record.id) + dt.timedelta(milliseconds=1)
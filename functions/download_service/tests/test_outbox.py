@@ -0,0 +1,190 @@
+import asyncio
+import datetime as dt
+from code import db
+from code.environment import OUTBOX_MAX_ATTEMPTS, OUTBOX_RETENTION_DAYS
+from code.models import OutboxEvent
+from code.repos import outbox as outbox_repo
+from code.repos.outbox import PUT_EVENTS_RETRIES, OutboxRepo, retry_delay
+
+import pytest
+from sqlalchemy import delete, func, update
+from sqlmodel import col, select
+
+
+@pytest.fixture()
+def outbox(run, eventbridge):
+    """Empty outbox, relayed to the moto EventBridge
+
+    The batches put to EventBridge are recorded as lists of details. An entry whose detail is in
+    `failing` fails as many times as its count says.
+    """
+
+    run(execute(delete(OutboxEvent)))
+
+    batches: list[list[str]] = []
+    failing: dict[str, int] = {}
+    put_events = eventbridge.put_events
+
+    async def put_events_failing(entries):
+        batches.append([entry["Detail"] for entry in entries])
+        passing = [entry for entry in entries if not failing.get(entry["Detail"])]
+        event_ids = iter(await put_events(passing) if passing else [])
+
+        results = []
+        for entry in entries:
+            if failing.get(entry["Detail"]):
+                failing[entry["Detail"]] -= 1
+                results.append(None)
+            else:
+                results.append(next(event_ids))
+        return results
+
+    eventbridge.put_events = put_events_failing
+    return eventbridge, batches, failing
+
+
+async def execute(statement):
+    async with db.session_context() as session:
+        await session.execute(statement)
+        await session.commit()
+
+
+def add_events(run, count, **fields):
+    async def add():
+        async with db.session_context() as session:
+            session.add_all(
+                OutboxEvent(source="tests", detail_type="test.created", detail=str(index), **fields) for index in range(count)
+            )
+            await session.commit()
+
+    run(add())
+
+
+def relay(run, eventbridge, **kwargs):
+    async def relay_once():
+        async with db.session_context() as session:
+            return await OutboxRepo(session=session, eventbridge=eventbridge).relay(**kwargs)
+
+    return run(relay_once())
+
+
+def stored_events(run):
+    async def select_all():
+        async with db.session_context() as session:
+            result = await session.execute(select(OutboxEvent).order_by(col(OutboxEvent.detail)))
+            return list(result.scalars().all())
+
+    return run(select_all())
+
+
+def test_relay_puts_events_in_batches_of_10(run, outbox):
+    eventbridge, batches, _ = outbox
+    add_events(run, 23)
+
+    assert relay(run, eventbridge) == 23
+
+    assert [len(batch) for batch in batches] == [10, 10, 3]
+    assert all(event.published_at for event in stored_events(run))
+    assert relay(run, eventbridge) == 0
+
+
+def test_relay_retries_only_the_failed_entries(run, outbox):
+    eventbridge, batches, failing = outbox
+    add_events(run, 3)
+    failing["1"] = 1
+
+    relay(run, eventbridge)
+
+    assert sorted(batches[0]) == ["0", "1", "2"]
+    assert batches[1:] == [["1"]]
+    assert [(event.attempts, bool(event.published_at)) for event in stored_events(run)] == [(0, True)] * 3
+
+
+def test_relay_backs_off_the_events_failing_across_runs(run, outbox):
+    eventbridge, batches, failing = outbox
+    add_events(run, 1)
+    # Every put of two relay runs, retries included
+    failing["0"] = 2 * (PUT_EVENTS_RETRIES + 1)
+
+    for attempts in (1, 2):
+        relay(run, eventbridge)
+        [event] = stored_events(run)
+        assert (event.attempts, event.published_at) == (attempts, None)
+        delay = event.next_attempt_at - dt.datetime.now(dt.UTC)
+        assert retry_delay(attempts) - dt.timedelta(seconds=2) < delay <= retry_delay(attempts)
+
+        # Skipped until its next attempt is due
+        put_count = len(batches)
+        assert relay(run, eventbridge) == 0
+        assert len(batches) == put_count
+        run(execute(update(OutboxEvent).values(next_attempt_at=func.now())))
+
+    assert relay(run, eventbridge) == 1
+    [event] = stored_events(run)
+    assert event.published_at
+    assert event.attempts == 2
+
+
+def test_relay_dead_letters_the_events_out_of_attempts(run, outbox, monkeypatch):
+    eventbridge, batches, failing = outbox
+    errors = []
+    monkeypatch.setattr(outbox_repo.logger, "error", lambda message, **fields: errors.append((message, fields["attempts"])))
+    add_events(run, 1, attempts=OUTBOX_MAX_ATTEMPTS - 1)
+    failing["0"] = PUT_EVENTS_RETRIES + 1
+
+    relay(run, eventbridge)
+
+    assert [(event.attempts, event.published_at) for event in stored_events(run)] == [(OUTBOX_MAX_ATTEMPTS, None)]
+    assert errors == [("Outbox event dead-lettered", OUTBOX_MAX_ATTEMPTS)]
+
+    # Given up on, so it isn't put anymore
+    put_count = len(batches)
+    assert relay(run, eventbridge) == 0
+    assert len(batches) == put_count
+
+
+def test_concurrent_relays_never_put_the_same_event(run, outbox):
+    eventbridge, batches, _ = outbox
+    add_events(run, 20)
+    put_events = eventbridge.put_events
+
+    async def put_events_slowly(entries):
+        # Keep the rows locked while the other relay selects
+        await asyncio.sleep(0.1)
+        return await put_events(entries)
+
+    eventbridge.put_events = put_events_slowly
+
+    async def relay_concurrently():
+        async with db.session_context() as session, db.session_context() as other_session:
+            return await asyncio.gather(
+                OutboxRepo(session=session, eventbridge=eventbridge).relay(limit=10),
+                OutboxRepo(session=other_session, eventbridge=eventbridge).relay(limit=10),
+            )
+
+    assert run(relay_concurrently()) == [10, 10]
+
+    details = [detail for batch in batches for detail in batch]
+    assert sorted(details) == sorted(str(index) for index in range(20))
+
+
+def test_purge_deletes_the_events_published_before_the_retention(run, outbox):
+    eventbridge, _, _ = outbox
+    now = dt.datetime.now(dt.UTC)
+    add_events(run, 1, published_at=now - dt.timedelta(days=OUTBOX_RETENTION_DAYS + 1))
+    add_events(run, 2, published_at=now - dt.timedelta(days=OUTBOX_RETENTION_DAYS - 1))
+    add_events(run, 3)
+
+    async def purge():
+        async with db.session_context() as session:
+            await OutboxRepo(session=session, eventbridge=eventbridge).purge()
+
+    run(purge())
+
+    assert sorted((event.detail, bool(event.published_at)) for event in stored_events(run)) == [
+        ("0", False),
+        ("0", True),
+        ("1", False),
+        ("1", True),
+        ("2", False),
+    ]
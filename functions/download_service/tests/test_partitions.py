@@ -0,0 +1,185 @@
+import asyncio
+import datetime as dt
+from code import db
+from code.models import Download
+from code.repos.partition import DownloadPartitionRepo, month_start, next_month_start
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import delete, text
+
+
+# The revision before the downloads were partitioned
+UNPARTITIONED_REVISION = "5a8e2c4b9d17"
+
+
+@pytest.fixture()
+def _partitions(run):
+    """Empty downloads table, whose partitions added by the test are dropped afterwards"""
+
+    run(execute(delete(Download)))
+    existing = set(partition_rows(run))
+    yield
+    for name in set(partition_rows(run)) - existing:
+        run(execute(text(f"DROP TABLE download.{name}")))
+
+
+async def execute(statement, parameters=None):
+    async with db.session_context() as session:
+        await session.execute(statement, parameters)
+        await session.commit()
+
+
+def fetch(run, statement):
+    async def select():
+        async with db.session_context() as session:
+            return (await session.execute(text(statement))).all()
+
+    return run(select())
+
+
+def partition_rows(run) -> dict[str, int]:
+    """Return the number of downloads in each partition, including the empty ones"""
+
+    rows = fetch(
+        run,
+        """
+        SELECT child.relname, (SELECT count(*) FROM download.downloads WHERE tableoid = child.oid)
+        FROM pg_inherits
+        JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'download.downloads'::regclass
+        """,
+    )
+    return dict(rows)
+
+
+def counters(run) -> tuple[int, int]:
+    """Return the sums of the requested and downloaded counter shards"""
+    return tuple(fetch(run, "SELECT sum(requested), sum(downloaded) FROM download.download_counters")[0])
+
+
+def archived_counts(run) -> tuple[int, int]:
+    """Return the counts of the archived counter shard"""
+    rows = fetch(run, "SELECT requested, downloaded FROM download.download_counters WHERE shard = -1")
+    return tuple(rows[0]) if rows else (0, 0)
+
+
+def add_downloads(run, created_at, count=1, **fields):
+    async def add():
+        async with db.session_context() as session:
+            session.add_all(
+                Download(email=f"reader{index}@example.com", name="Reader", created_at=created_at, **fields) for index in range(count)
+            )
+            await session.commit()
+
+    run(add())
+
+
+def create_partition(run, start):
+    run(
+        execute(
+            text(
+                f"CREATE TABLE download.downloads_p{start:%Y_%m} PARTITION OF download.downloads "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{next_month_start(start).isoformat()}')",
+            ),
+        ),
+    )
+
+
+def migrate(migration, revision):
+    # The migrations look the current loop up, which they and the asyncio tests leave unset
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    migration(Config("alembic.ini"), revision)
+
+
+def partition_repo(run, method, **kwargs):
+    async def call():
+        async with db.session_context() as session:
+            return await getattr(DownloadPartitionRepo(session=session), method)(**kwargs)
+
+    return run(call())
+
+
+@pytest.mark.usefixtures("_partitions")
+def test_create_ahead_moves_the_rows_out_of_the_default_partition(run):
+    # Past the partitions created by the migration, so the rows land in the default partition
+    start = month_start(dt.datetime.now(dt.UTC))
+    for _ in range(5):
+        start = next_month_start(start)
+    add_downloads(run, start + dt.timedelta(days=3), count=2)
+    add_downloads(run, start + dt.timedelta(days=40))
+    before = counters(run)
+    assert partition_rows(run)["downloads_default"] == 3
+
+    created = partition_repo(run, "create_ahead", months=5)
+
+    assert created[-1] == f"downloads_p{start:%Y_%m}"
+    assert partition_rows(run)[created[-1]] == 2
+    assert partition_rows(run)["downloads_default"] == 1
+    assert counters(run) == before
+    assert partition_repo(run, "create_ahead", months=5) == []
+
+
+@pytest.mark.usefixtures("_partitions")
+def test_sweep_drops_the_old_partitions_without_redeemable_links(run):
+    now = dt.datetime.now(dt.UTC)
+    expired = {"expires_at": dt.datetime(2020, 3, 1, tzinfo=dt.UTC)}
+    for month in (1, 2):
+        create_partition(run, dt.datetime(2020, month, 1, tzinfo=dt.UTC))
+    last_month = month_start(month_start(now) - dt.timedelta(days=1))
+    create_partition(run, last_month)
+
+    add_downloads(run, dt.datetime(2020, 1, 10, tzinfo=dt.UTC), count=2, **expired)
+    add_downloads(run, dt.datetime(2020, 1, 20, tzinfo=dt.UTC), is_downloaded=True)
+    add_downloads(run, dt.datetime(2020, 2, 10, tzinfo=dt.UTC), **expired)
+    # Still redeemable, so its partition is kept
+    add_downloads(run, dt.datetime(2020, 2, 20, tzinfo=dt.UTC))
+    # Within the retention
+    add_downloads(run, last_month, **expired)
+    before = counters(run)
+    archived_before = archived_counts(run)
+
+    assert partition_repo(run, "sweep", retention_days=31) == ["downloads_p2020_01"]
+
+    rows = partition_rows(run)
+    assert "downloads_p2020_01" not in rows
+    assert rows["downloads_p2020_02"] == 2
+    assert rows[f"downloads_p{last_month:%Y_%m}"] == 1
+    assert counters(run) == before
+    assert archived_counts(run) == (archived_before[0] + 3, archived_before[1] + 1)
+
+
+@pytest.mark.usefixtures("_partitions")
+def test_migration_moves_the_downloads_to_their_partitions(run):
+    now = dt.datetime.now(dt.UTC)
+    two_months_ago = month_start(month_start(month_start(now) - dt.timedelta(days=1)) - dt.timedelta(days=1))
+
+    migrate(command.downgrade, UNPARTITIONED_REVISION)
+    try:
+        run(db.engine.dispose())
+        run(
+            execute(
+                text(
+                    """
+                    INSERT INTO download.downloads (id, email, name, expires_at, is_downloaded, created_at)
+                    VALUES
+                        (gen_random_uuid(), 'reader1@example.com', 'Reader', now(), true, :old),
+                        (gen_random_uuid(), 'reader2@example.com', 'Reader', now(), false, :old),
+                        (gen_random_uuid(), 'reader3@example.com', 'Reader', now(), false, now())
+                    """,
+                ),
+                {"old": two_months_ago + dt.timedelta(days=5)},
+            ),
+        )
+        before = counters(run)
+    finally:
+        migrate(command.upgrade, "head")
+        run(db.engine.dispose())
+
+    rows = partition_rows(run)
+    assert rows[f"downloads_p{two_months_ago:%Y_%m}"] == 2
+    assert rows[f"downloads_p{now:%Y_%m}"] == 1
+    assert rows["downloads_default"] == 0
+    assert f"downloads_p{next_month_start(next_month_start(next_month_start(now))):%Y_%m}" in rows
+    assert counters(run) == before
@@ -0,0 +1,167 @@
+import datetime as dt
+import json
+import threading
+from code import db, tokens
+from code.adapter import HttpApiAdapter
+from code.api_handler import app
+from code.cache import TtlCache
+from code.environment import DOWNLOAD_BATCH_MAX_SIZE
+from code.models import Download, RequestThrottle
+from code.models.base import uuid7
+from code.repos.download import DownloadRepo
+from code.routes.download import redirect_requested
+from code.s3 import S3
+from code.tokens import sign_token
+from pathlib import Path
+
+import pytest
+from sqlalchemy import delete
+from sqlmodel import select
+
+
+URL = "https://real-life-iac.s3.amazonaws.com/ebook.pdf?X-Amz-Signature=abc"
+
+EVENTS = Path(__file__).parent / "events"
+
+handler = HttpApiAdapter(app)
+
+
+def test_redirect_requested():
+    assert redirect_requested(redirect=None, accept="text/html,application/xhtml+xml,*/*;q=0.8")
+    assert not redirect_requested(redirect=None, accept="application/json")
+    assert not redirect_requested(redirect=None, accept=None)
+    assert redirect_requested(redirect=True, accept="application/json")
+    assert not redirect_requested(redirect=False, accept="text/html")
+
+
+@pytest.fixture()
+def download(monkeypatch):
+    """Invoke GET /download/{token} with a valid token, without the database and S3"""
+
+    async def get(self, token):  # noqa: ARG001
+        return None
+
+    async def get_ebook_presigned_url(self):  # noqa: ARG001
+        return URL
+
+    monkeypatch.setattr(DownloadRepo, "get", get)
+    monkeypatch.setattr(S3, "get_ebook_presigned_url", get_ebook_presigned_url)
+
+    event = json.loads((EVENTS / "http_api_invalid_token.json").read_text())
+    event["rawPath"] = f"/download/{sign_token(uuid7(), dt.datetime.now(tz=dt.UTC) + dt.timedelta(hours=1))}"
+    event["requestContext"]["http"]["path"] = event["rawPath"]
+
+    def invoke(accept, query=""):
+        return handler({**event, "headers": {**event["headers"], "accept": accept}, "rawQueryString": query}, None)
+
+    return invoke
+
+
+def test_download_returns_url(download):
+    response = download(accept="application/json")
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"url": URL}
+    assert response["headers"]["vary"] == "Accept"
+
+
+def test_download_loads_the_signing_keys_off_the_event_loop(monkeypatch, download):
+    threads = []
+
+    def get_secret(**_):
+        threads.append(threading.current_thread().name)
+        return tokens.LOCAL_TOKEN_SIGNING_KEY.decode()
+
+    monkeypatch.setattr(tokens, "TOKEN_SECRET_NAME", "/download-service/api/token-signing-key")
+    monkeypatch.setattr(tokens, "signing_keys_cache", TtlCache(ttl_seconds=60))
+    monkeypatch.setattr("aws_lambda_powertools.utilities.parameters.get_secret", get_secret)
+
+    assert download(accept="application/json")["statusCode"] == 200
+    assert len(threads) == 1
+    assert threads[0].startswith("aws")
+
+
+@pytest.mark.parametrize(("accept", "query"), [("text/html,*/*;q=0.8", ""), ("application/json", "redirect=true")])
+def test_download_redirects(download, accept, query):
+    response = download(accept=accept, query=query)
+
+    assert response["statusCode"] == 302
+    assert response["headers"]["location"] == URL
+    assert response["headers"]["cache-control"] == "no-store"
+    assert response["headers"]["vary"] == "Accept"
+
+
+def post(path, body):
+    """Invoke a POST route with a JSON body"""
+
+    event = json.loads((EVENTS / "http_api_invalid_request.json").read_text())
+    event["rawPath"] = event["requestContext"]["http"]["path"] = path
+    response = handler({**event, "body": json.dumps(body)}, None)
+    return response["statusCode"], json.loads(response["body"] or "null")
+
+
+@pytest.fixture()
+def post_to_database(run, monkeypatch):
+    """Invoke a POST route on the test database, emptied of downloads and throttles, within its query budget
+
+    The pooled connections are bound to a loop, so they are closed when switching to the loop of the handler and back.
+    """
+
+    async def empty():
+        async with db.session_context() as session:
+            await session.execute(delete(Download))
+            await session.execute(delete(RequestThrottle))
+            await session.commit()
+
+    run(empty())
+    run(db.engine.dispose())
+    monkeypatch.setattr("code.timing.QUERY_BUDGET_STRICT", True)
+    yield post
+    handler.loop.run_until_complete(db.engine.dispose())
+
+
+def test_batch_accepts_or_rejects_each_request_in_order(post_to_database):
+    assert post_to_database("/download", {"email": "throttled@example.com", "name": "Reader"})[0] == 201
+
+    status_code, results = post_to_database(
+        "/download/batch",
+        [
+            {"email": "first@example.com", "name": "First"},
+            {"email": "throttled@example.com", "name": "Reader"},
+            {"email": "second@example.com", "name": "Second"},
+            {"email": "first@example.com", "name": "First again"},
+        ],
+    )
+
+    assert status_code == 200
+    assert [(result["email"], result["is_accepted"]) for result in results] == [
+        ("first@example.com", True),
+        ("throttled@example.com", False),
+        ("second@example.com", True),
+        ("first@example.com", False),
+    ]
+    assert [result["detail"] is None for result in results] == [True, False, True, False]
+    assert "try again in" in results[1]["detail"]
+    assert "try again in" in results[3]["detail"]
+
+    # Accepted by the previous batch, so inside the backoff window
+    _, results = post_to_database("/download/batch", [{"email": "second@example.com", "name": "Second"}])
+    assert [result["is_accepted"] for result in results] == [False]
+
+    async def stored_requests():
+        async with db.session_context() as session:
+            result = await session.execute(select(Download.email, Download.name).order_by(Download.email))
+            return result.all()
+
+    assert handler.loop.run_until_complete(stored_requests()) == [
+        ("first@example.com", "First"),
+        ("second@example.com", "Second"),
+        ("throttled@example.com", "Reader"),
+    ]
+
+
+@pytest.mark.parametrize("size", [0, DOWNLOAD_BATCH_MAX_SIZE + 1])
+def test_batch_size_is_validated(size):
+    status_code, _ = post("/download/batch", [{"email": f"reader{index}@example.com", "name": "Reader"} for index in range(size)])
+
+    assert status_code == 422
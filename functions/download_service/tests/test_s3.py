@@ -0,0 +1,35 @@
+import gzip
+import os
+from code.environment import BUCKET_NAME
+from code.s3 import MIN_PART_SIZE_BYTES
+
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_gzip_upload_streams_parts(s3):
+    # Random bytes don't compress, so the object spans several parts
+    chunks = [os.urandom(1024 * 1024) for _ in range(12)]
+
+    async with s3.upload_gzip(key="archive/test.gz", part_size=MIN_PART_SIZE_BYTES) as upload:
+        for chunk in chunks:
+            await upload.write(chunk)
+            assert len(upload.buffer) < MIN_PART_SIZE_BYTES
+
+    assert len(upload.parts) == 3
+    body = s3.client.get_object(Bucket=BUCKET_NAME, Key="archive/test.gz")["Body"].read()
+    assert gzip.decompress(body) == b"".join(chunks)
+
+
+@pytest.mark.asyncio()
+async def test_gzip_upload_aborts_on_error(s3):
+    async def fail_midway():
+        async with s3.upload_gzip(key="archive/test.gz") as upload:
+            await upload.write(b"partial")
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        await fail_midway()
+
+    assert "Uploads" not in s3.client.list_multipart_uploads(Bucket=BUCKET_NAME)
+    assert "Contents" not in s3.client.list_objects_v2(Bucket=BUCKET_NAME)
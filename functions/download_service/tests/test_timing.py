@@ -0,0 +1,79 @@
+import asyncio
+import json
+import sys
+from code import adapter, timing
+from code.adapter import HttpApiAdapter
+from code.timing import QueryBudgetExceededError, ServerTimingMiddleware, current_timings, query_budget, record
+from pathlib import Path
+
+import pytest
+from fastapi import Depends, FastAPI
+from starlette.responses import PlainTextResponse
+
+
+EVENT = json.loads((Path(__file__).parent / "events" / "http_api_health.json").read_text())
+
+
+async def app(scope, receive, send):
+    with record("s3"):
+        await asyncio.sleep(0.01)
+    with record("db"):
+        pass
+    with record("db"):
+        pass
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def test_server_timing_header():
+    handler = HttpApiAdapter(ServerTimingMiddleware(app))
+
+    response = handler(EVENT, None)
+
+    metrics = dict(metric.split(";", 1) for metric in response["headers"]["server-timing"].split(", "))
+    assert metrics.keys() == {"s3", "db", "total"}
+    assert metrics["db"].endswith('desc="2 calls"')
+    assert float(metrics["s3"].split(";")[0].removeprefix("dur=")) >= 10
+    assert current_timings.get() is None
+
+
+def test_record_outside_request():
+    with record("s3"):
+        pass
+
+    assert current_timings.get() is None
+
+
+@pytest.fixture()
+def budget_handler():
+    api = FastAPI()
+
+    @api.get("/health", dependencies=[Depends(query_budget(1))])
+    async def health() -> None:
+        current_timings.get().add(timing.QUERIES, 1)
+        current_timings.get().add(timing.QUERIES, 1)
+
+    return HttpApiAdapter(ServerTimingMiddleware(api))
+
+
+def test_query_budget_exceeded_is_logged(budget_handler, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(timing.logger, "warning", lambda message, **fields: warnings.append((message, fields)))
+
+    response = budget_handler(EVENT, None)
+
+    assert response["statusCode"] == 200
+    assert warnings == [("Query budget exceeded", {"method": "GET", "path": "/health", "query_count": 2, "query_budget": 1})]
+
+
+def test_query_budget_exceeded_fails_the_request_in_strict_mode(budget_handler, monkeypatch):
+    errors = []
+    monkeypatch.setattr(timing, "QUERY_BUDGET_STRICT", True)
+    monkeypatch.setattr(adapter.logger, "exception", lambda *_, **__: errors.append(sys.exception()))
+
+    response = budget_handler(EVENT, None)
+
+    # Raised before the response starts, so the adapter answers with a 500
+    assert response["statusCode"] == 500
+    [error] = errors
+    assert isinstance(error, QueryBudgetExceededError)
+    assert "ran 2 SQL statements, over its budget of 1" in str(error)
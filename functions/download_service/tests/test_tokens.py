@@ -0,0 +1,115 @@
+import asyncio
+import datetime as dt
+import json
+import threading
+from code import tokens
+from code.cache import TtlCache
+from code.models import Download
+from code.routes.download import parse_token
+from code.tokens import ExpiredTokenError, InvalidTokenError, SigningKeysNotLoadedError, sign_token, verify_token
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+
+def test_download_link_carries_a_signed_token():
+    record = Download(email="reader@example.com", name="Reader")
+
+    token = record.link.rsplit("/", 1)[-1]
+
+    assert len(token) == tokens.TOKEN_LENGTH
+    assert verify_token(token) == record.id
+
+
+def test_forged_token_is_rejected():
+    token = sign_token(uuid4(), dt.datetime.now(dt.UTC) + dt.timedelta(hours=1))
+    forged = token[:-2] + ("AA" if token[-2:] != "AA" else "BB")
+
+    with pytest.raises(InvalidTokenError):
+        verify_token(forged)
+    with pytest.raises(InvalidTokenError):
+        verify_token("not-a-token")
+
+
+def test_expired_token_is_rejected():
+    token = sign_token(uuid4(), dt.datetime.now(dt.UTC) - dt.timedelta(seconds=1))
+
+    with pytest.raises(ExpiredTokenError):
+        verify_token(token)
+
+
+def test_rotated_keys_verify(monkeypatch):
+    download_id = uuid4()
+    monkeypatch.setattr(tokens, "get_signing_keys", lambda: [b"old"])
+    token = sign_token(download_id, dt.datetime.now(dt.UTC) + dt.timedelta(hours=1))
+
+    monkeypatch.setattr(tokens, "get_signing_keys", lambda: [b"new", b"old"])
+    assert verify_token(token) == download_id
+
+    monkeypatch.setattr(tokens, "get_signing_keys", lambda: [b"new"])
+    with pytest.raises(InvalidTokenError):
+        verify_token(token)
+
+
+def test_signing_keys_from_secret(monkeypatch):
+    secrets = iter(["new, old", "newer, new"])
+    monkeypatch.setattr(tokens, "TOKEN_SECRET_NAME", "/download-service/api/token-signing-key")
+    monkeypatch.setattr(tokens, "signing_keys_cache", TtlCache(ttl_seconds=60))
+    monkeypatch.setattr("aws_lambda_powertools.utilities.parameters.get_secret", lambda **_: next(secrets))
+
+    with pytest.raises(SigningKeysNotLoadedError):
+        tokens.get_signing_keys()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(tokens.load_signing_keys())
+        assert tokens.get_signing_keys() == [b"new", b"old"]
+
+        # Expired keys stay usable for the request that loaded them, then have to be refreshed
+        tokens.signing_keys_cache.expires_at -= 60
+        assert tokens.get_signing_keys() == [b"new", b"old"]
+        tokens.signing_keys_cache.expires_at -= tokens.SIGNING_KEYS_STALE_SECONDS
+        with pytest.raises(SigningKeysNotLoadedError):
+            tokens.get_signing_keys()
+
+        assert loop.run_until_complete(tokens.load_signing_keys()) == [b"newer", b"new"]
+    finally:
+        loop.close()
+    assert tokens.get_signing_keys() == [b"newer", b"new"]
+
+
+def test_signing_keys_are_loaded_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def get_secret(**_):
+        threads.append(threading.current_thread().name)
+        return "new, old"
+
+    monkeypatch.setattr(tokens, "TOKEN_SECRET_NAME", "/download-service/api/token-signing-key")
+    monkeypatch.setattr(tokens, "signing_keys_cache", TtlCache(ttl_seconds=60))
+    monkeypatch.setattr("aws_lambda_powertools.utilities.parameters.get_secret", get_secret)
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(tokens.load_signing_keys()) == [b"new", b"old"]
+    finally:
+        loop.close()
+    assert tokens.get_signing_keys() == [b"new", b"old"]
+
+    assert len(threads) == 1
+    assert threads[0].startswith("aws")
+
+
+def test_parse_token(monkeypatch):
+    legacy = uuid4()
+
+    assert parse_token(str(legacy)) == legacy
+    assert parse_token(legacy.hex) == legacy
+
+    monkeypatch.setattr("code.routes.download.LEGACY_TOKENS_ENABLED", False)
+    with pytest.raises(HTTPException) as error:
+        parse_token(legacy.hex)
+
+    assert error.value.status_code == 404
+    assert json.dumps(error.value.detail) == '"Invalid link."'
@@ -1,5 +1,10 @@
-from code.environment import CORS_ORIGINS, SERVICE_NAME
+import json
+from code.adapter import HttpApiAdapter
+from code.environment import API_ADAPTER, CORS_ORIGINS, PRIME_ON_INIT, SERVICE_NAME
 from code.routes import router
+from code.timing import ServerTimingMiddleware
+from code.warmup import warm_up
+from pathlib import Path
 from typing import Any
 
 from aws_lambda_powertools import Logger, Tracer
@@ -20,17 +25,62 @@ app = FastAPI(
     version="1.0.0",
 )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# With the slim adapter the API Gateway CORS configuration answers the preflight requests and sets the headers
+if API_ADAPTER != "http_api":
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Server-Timing"],
+    )
+
+# Outermost, so the timings cover the whole request
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(router=router, prefix="/email")
 
-mangum_handler = Mangum(app)
+
+def get_asgi_handler() -> Mangum | HttpApiAdapter:
+    """Build the adapter running the app for API Gateway events
+
+    * mangum: supports every Lambda event source, runs the lifespan on every invocation.
+    * http_api: translates HTTP API payload v2 events directly and runs the lifespan once.
+    """
+
+    if API_ADAPTER == "http_api":
+        return HttpApiAdapter(app)
+
+    if API_ADAPTER != "mangum":
+        msg = f"Invalid API_ADAPTER: {API_ADAPTER}. Expected 'mangum' or 'http_api'."
+        raise ValueError(msg)
+
+    return Mangum(app)
+
+
+asgi_handler = get_asgi_handler()
+
+# Written at image build time by `python -m code.openapi`
+openapi_file = Path(__file__).parent / "openapi.json"
+
+
+def openapi() -> dict[str, Any]:
+    """Serve the OpenAPI schema generated at build time, so it's never built on a cold start
+
+    Falls back to generating it on the first request when the file is missing, e.g. when running locally.
+    """
+
+    if app.openapi_schema is None:
+        if openapi_file.exists():
+            app.openapi_schema = json.loads(openapi_file.read_text())
+        else:
+            app.openapi_schema = FastAPI.openapi(app)
+
+    return app.openapi_schema
+
+
+app.openapi = openapi  # type: ignore[method-assign]
 
 
 @app.get("/health", include_in_schema=False)
@@ -59,6 +109,11 @@ def handler(event: dict, context: LambdaContext) -> Any:
         and event.get("detail") == {}
     ):
         logger.info("Keep warm event.")
-        return None
+        return warm_up()
+
+    return asgi_handler(event, context)
+
 
-    return mangum_handler(event, context)
+# Primes in the init phase, after the adapter set the event loop the requests run on
+if PRIME_ON_INIT:
+    warm_up()
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from code.environment import (
+    AWS_CONNECT_TIMEOUT_SECONDS,
+    AWS_MAX_ATTEMPTS,
+    AWS_MAX_WORKERS,
+    AWS_READ_TIMEOUT_SECONDS,
+    AWS_REGION,
+    LOCALSTACK_ENDPOINT,
+    SERVICE_NAME,
+)
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar
+
+from aws_lambda_powertools import Logger
+
+
+if TYPE_CHECKING:
+    import boto3
+
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+logger = Logger(service=SERVICE_NAME)
+
+# boto3 clients are thread safe, so blocking calls are run in a bounded thread pool
+# and concurrent requests or events overlap their network round trips
+executor = ThreadPoolExecutor(max_workers=AWS_MAX_WORKERS, thread_name_prefix="aws")
+
+clients: dict[str, Any] = {}
+clients_lock = threading.Lock()
+
+
+@cache
+def get_session() -> "boto3.Session":
+    """Get the boto3 session shared by every client
+
+    boto3 is only imported here, so it stays off the cold start of code paths that never call AWS.
+    """
+    import boto3
+
+    return boto3.Session()
+
+
+def get_client(service_name: str) -> Any:
+    """Get the client of an AWS service, created once per execution environment
+
+    If LOCALSTACK_ENDPOINT is not defined, the client will be initialized with the default endpoint (AWS account).
+    """
+
+    if service_name not in clients:
+        with clients_lock:
+            if service_name not in clients:
+                from botocore.config import Config
+
+                clients[service_name] = get_session().client(
+                    service_name=service_name,
+                    region_name=AWS_REGION,
+                    endpoint_url=LOCALSTACK_ENDPOINT,
+                    # One pooled connection per worker thread, kept alive between invocations
+                    config=Config(
+                        max_pool_connections=AWS_MAX_WORKERS,
+                        tcp_keepalive=True,
+                        connect_timeout=AWS_CONNECT_TIMEOUT_SECONDS,
+                        read_timeout=AWS_READ_TIMEOUT_SECONDS,
+                        retries={"mode": "adaptive", "max_attempts": AWS_MAX_ATTEMPTS},
+                    ),
+                )
+                logger.info("AWS client created", service_name=service_name)
+
+    return clients[service_name]
+
+
+async def run_in_executor(func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+    """Run a blocking boto3 call in the AWS thread pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
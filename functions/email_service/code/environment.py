@@ -5,5 +5,32 @@ SERVICE_NAME = os.environ.get("SERVICE_NAME", "download-service")
 EVENT_BUS_NAME = os.environ.get("EVENT_BUS_NAME", "default")
 AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
 DB_SECRET_NAME = os.environ.get("DB_SECRET_NAME", "/postgres")
+DB_SECRET_MAX_AGE_SECONDS = int(os.environ.get("DB_SECRET_MAX_AGE_SECONDS", "300"))
 LOCALSTACK_ENDPOINT = os.environ.get("LOCALSTACK_ENDPOINT")
+AWS_MAX_WORKERS = int(os.environ.get("AWS_MAX_WORKERS", "10"))
+AWS_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("AWS_CONNECT_TIMEOUT_SECONDS", "2"))
+AWS_READ_TIMEOUT_SECONDS = float(os.environ.get("AWS_READ_TIMEOUT_SECONDS", "10"))
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "3"))
 CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "*").split(",")
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "true").lower() == "true"
+QUERY_BUDGET_STRICT = os.environ.get("QUERY_BUDGET_STRICT", "false").lower() == "true"  # Raise instead of logging
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "200"))
+PRIME_ON_INIT = os.environ.get("PRIME_ON_INIT", "false").lower() == "true"  # Only in Lambda, where the loop is reused
+DB_DRIVER_PRESET = os.environ.get("DB_DRIVER_PRESET", "direct")  # "proxy" behind a transaction-mode connection proxy
+DB_STATEMENT_CACHE_SIZE = os.environ.get("DB_STATEMENT_CACHE_SIZE")  # Overrides the preset, 0 disables the cache
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 disables the timeout
+DB_JIT_ENABLED = os.environ.get("DB_JIT_ENABLED", "false").lower() == "true"
+DB_APPLICATION_NAME = os.environ.get("DB_APPLICATION_NAME", SERVICE_NAME)
+DB_POOL_MODE = os.environ.get("DB_POOL_MODE", "queue")  # "queue" keeps connections alive, "null" when behind a proxy
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "2"))
+DB_POOL_MAX_OVERFLOW = int(os.environ.get("DB_POOL_MAX_OVERFLOW", "3"))
+DB_POOL_TIMEOUT_SECONDS = int(os.environ.get("DB_POOL_TIMEOUT_SECONDS", "10"))
+DB_POOL_RECYCLE_SECONDS = int(os.environ.get("DB_POOL_RECYCLE_SECONDS", "300"))
+API_ADAPTER = os.environ.get("API_ADAPTER", "mangum")  # "http_api" for the slim API Gateway payload v2 adapter
+OUTBOX_RELAY_LIMIT = int(os.environ.get("OUTBOX_RELAY_LIMIT", "100"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.environ.get("OUTBOX_RETRY_BASE_SECONDS", "5"))  # Doubled after each failed attempt
+OUTBOX_RETRY_MAX_SECONDS = float(os.environ.get("OUTBOX_RETRY_MAX_SECONDS", "3600"))
+OUTBOX_RELAY_SECONDS = float(os.environ.get("OUTBOX_RELAY_SECONDS", "0"))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.environ.get("OUTBOX_POLL_INTERVAL_SECONDS", "2"))
+OUTBOX_RETENTION_DAYS = int(os.environ.get("OUTBOX_RETENTION_DAYS", "7"))
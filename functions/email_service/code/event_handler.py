@@ -1,11 +1,13 @@
 import asyncio
 from code.db import get_session_context
-from code.environment import SERVICE_NAME
+from code.environment import PRIME_ON_INIT, SERVICE_NAME
 from code.eventbridge import get_eventbridge_context
 from code.models import BookRequest, MailingCreate
 from code.repos.book_request import BookRequestRepo
 from code.repos.mailing import MailingRepo
+from code.repos.outbox import OutboxRepo
 from code.ses import get_ses_context
+from code.warmup import warm_up
 from typing import Any
 
 from aws_lambda_powertools import Logger, Tracer
@@ -16,16 +18,20 @@ from aws_lambda_powertools.utilities.typing import LambdaContext
 logger = Logger(service=SERVICE_NAME)
 tracer = Tracer(service=SERVICE_NAME)
 
+# Reused across invocations, so pooled connections stay bound to a live loop
+loop = asyncio.new_event_loop()
+
 
 @tracer.capture_method(capture_response=False)
 async def process(parsed_event: EventBridgeEvent) -> None:
     """Process events."""
 
-    async with get_eventbridge_context() as eventbridge, get_ses_context() as ses, get_session_context() as session:
-        book_request_repo = BookRequestRepo(eventbridge=eventbridge, ses=ses)
-        mailing_repo = MailingRepo(eventbridge=eventbridge, session=session)
+    async with get_ses_context() as ses, get_session_context() as session:
+        book_request_repo = BookRequestRepo(session=session, ses=ses)
+        mailing_repo = MailingRepo(session=session)
 
         if parsed_event.detail_type == "book.requested":
+            # The mailing is only created once the email is sent, so a failed send leaves no subscription behind
             await book_request_repo.send(BookRequest(**parsed_event.detail))
             await mailing_repo.create(new=MailingCreate(**parsed_event.detail))
 
@@ -37,10 +43,14 @@ async def process(parsed_event: EventBridgeEvent) -> None:
             logger.exception("Unhandled event type", event_type=parsed_event.detail_type)
             raise RuntimeError(msg)
 
+    # Publish the events written above right away, the scheduled relay picks up whatever fails here
+    async with get_session_context() as session, get_eventbridge_context() as eventbridge:
+        await OutboxRepo(session=session, eventbridge=eventbridge).relay()
+
 
 @logger.inject_lambda_context(log_event=True)
 @tracer.capture_lambda_handler(capture_response=False)
-def handler(event: dict[str, Any], _context: LambdaContext) -> None:
+def handler(event: dict[str, Any], _context: LambdaContext) -> dict[str, Any] | None:
     """AWS Lambda handler for cloud events."""
     if (
         isinstance(event, dict)
@@ -49,8 +59,14 @@ def handler(event: dict[str, Any], _context: LambdaContext) -> None:
         and event.get("detail") == {}
     ):
         logger.info("Keep warm event.")
-        return
+        return warm_up(loop)
 
     parsed_event = EventBridgeEvent(event)
 
-    asyncio.run(process(parsed_event))
+    loop.run_until_complete(process(parsed_event))
+    return None
+
+
+# Primes in the init phase, on the loop the events are processed on
+if PRIME_ON_INIT:
+    warm_up(loop)
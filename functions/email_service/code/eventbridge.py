@@ -1,34 +1,28 @@
-from code.environment import EVENT_BUS_NAME, LOCALSTACK_ENDPOINT, SERVICE_NAME
+from code.aws import get_client, run_in_executor
+from code.environment import EVENT_BUS_NAME, SERVICE_NAME
+from code.timing import record
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
-from typing import cast
+from typing import TYPE_CHECKING, cast
 
-import boto3
 from aws_lambda_powertools import Logger
-from mypy_boto3_events import EventBridgeClient
+
+
+if TYPE_CHECKING:
+    from mypy_boto3_events import EventBridgeClient
+    from mypy_boto3_events.type_defs import PutEventsRequestEntryTypeDef
 
 
 logger = Logger(service=SERVICE_NAME)
-session = boto3.Session()
 
 
 class EventBridge:
     """EventBridge client."""
 
     def __init__(self) -> None:
-        """Initialize EventBridge.
+        """Initialize EventBridge with the shared events client."""
 
-        If LOCALSTACK_ENDPOINT is not defined, the client will be initialized with the default endpoint (AWS account).
-        """
-
-        self.client = cast(
-            EventBridgeClient,
-            session.client(
-                service_name="events",
-                endpoint_url=LOCALSTACK_ENDPOINT,
-            ),
-        )
-        logger.info("EventBridge initialized.")
+        self.client = cast("EventBridgeClient", get_client("events"))
 
     async def put_event(self, prefix: str, type: str, detail: str, source: str) -> str:
         """Put an event in the EventBridge.
@@ -44,16 +38,18 @@ class EventBridge:
         """
         detail_type = f"{prefix}.{type}"
 
-        response = self.client.put_events(
-            Entries=[
-                {
-                    "Source": source,
-                    "EventBusName": EVENT_BUS_NAME,
-                    "DetailType": detail_type,
-                    "Detail": detail,
-                },
-            ],
-        )
+        with record("eventbridge"):
+            response = await run_in_executor(
+                self.client.put_events,
+                Entries=[
+                    {
+                        "Source": source,
+                        "EventBusName": EVENT_BUS_NAME,
+                        "DetailType": detail_type,
+                        "Detail": detail,
+                    },
+                ],
+            )
         event_id = response["Entries"][0]["EventId"]
 
         logger.info(
@@ -65,6 +61,33 @@ class EventBridge:
 
         return event_id
 
+    async def put_events(self, entries: list["PutEventsRequestEntryTypeDef"]) -> list[str | None]:
+        """Put up to 10 events in the EventBridge with a single call.
+
+        * entries: the events with Source, DetailType and Detail. The EventBusName is filled in.
+
+        Returns
+        -------
+            list[str | None]: eventbridge event ID of each entry, in order, or None if the entry failed
+
+        """
+        with record("eventbridge"):
+            response = await run_in_executor(
+                self.client.put_events,
+                Entries=[{**entry, "EventBusName": EVENT_BUS_NAME} for entry in entries],
+            )
+
+        if response["FailedEntryCount"]:
+            logger.warning(
+                "EventBridge failed to put some events",
+                failed_entry_count=response["FailedEntryCount"],
+                error_codes=[entry.get("ErrorCode") for entry in response["Entries"] if "ErrorCode" in entry],
+            )
+
+        logger.info("EventBridge events put", entry_count=len(entries), failed_entry_count=response["FailedEntryCount"])
+
+        return [entry.get("EventId") if "ErrorCode" not in entry else None for entry in response["Entries"]]
+
 
 async def get_eventbridge() -> AsyncGenerator[EventBridge]:
     """Get EventBridge instance."""
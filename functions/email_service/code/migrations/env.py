@@ -1,6 +1,6 @@
 # ruff:noqa: ARG001
 import asyncio
-from code.db import db_secret
+from code.db import get_db_secret
 
 # All models must be imported here
 from code.models import *  # noqa: F403
@@ -72,6 +72,7 @@ def do_run_migrations(connection: Connection) -> None:
 
 async def run_async_migrations() -> None:
     """Create an Engine and associate a connection with the context and run async migrations"""
+    db_secret = get_db_secret()
     try:
         engine = create_async_engine(
             url=URL.create(**db_secret),
@@ -0,0 +1,53 @@
+"""add outbox events
+
+Revision ID: e4b7d1f8a26c
+Revises: 0da05cbf693f
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b7d1f8a26c"
+down_revision: str | None = "0da05cbf693f"
+branch_labels: str | list[str] | None = None
+depends_on: str | list[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade to 'e4b7d1f8a26c'"""
+    op.create_table(
+        "outbox_events",
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("source", sqlmodel.String(), nullable=False),
+        sa.Column("detail_type", sqlmodel.String(), nullable=False),
+        sa.Column("detail", sqlmodel.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        schema="email",
+    )
+    op.create_index(op.f("ix_email_outbox_events_created_at"), "outbox_events", ["created_at"], unique=False, schema="email")
+    op.create_index(op.f("ix_email_outbox_events_updated_at"), "outbox_events", ["updated_at"], unique=False, schema="email")
+    op.create_index(
+        "ix_email_outbox_events_pending",
+        "outbox_events",
+        ["created_at"],
+        unique=False,
+        schema="email",
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade to '0da05cbf693f'"""
+    op.drop_index("ix_email_outbox_events_pending", table_name="outbox_events", schema="email")
+    op.drop_index(op.f("ix_email_outbox_events_updated_at"), table_name="outbox_events", schema="email")
+    op.drop_index(op.f("ix_email_outbox_events_created_at"), table_name="outbox_events", schema="email")
+    op.drop_table("outbox_events", schema="email")
@@ -0,0 +1,50 @@
+"""add outbox retry backoff
+
+Revision ID: 7b2e9d4c1a35
+Revises: e4b7d1f8a26c
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b2e9d4c1a35"
+down_revision: str | None = "e4b7d1f8a26c"
+branch_labels: str | list[str] | None = None
+depends_on: str | list[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade to '7b2e9d4c1a35'"""
+    # The pending events are relayed right away
+    op.add_column(
+        "outbox_events",
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        schema="email",
+    )
+    op.drop_index("ix_email_outbox_events_pending", table_name="outbox_events", schema="email")
+    op.create_index(
+        "ix_email_outbox_events_pending",
+        "outbox_events",
+        ["next_attempt_at"],
+        unique=False,
+        schema="email",
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade to 'e4b7d1f8a26c'"""
+    op.drop_index("ix_email_outbox_events_pending", table_name="outbox_events", schema="email")
+    op.create_index(
+        "ix_email_outbox_events_pending",
+        "outbox_events",
+        ["created_at"],
+        unique=False,
+        schema="email",
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+    op.drop_column("outbox_events", "next_attempt_at", schema="email")
@@ -1,2 +1,3 @@
 from code.models.book_request import BookRequest
 from code.models.mailing import Mailing, MailingCreate
+from code.models.outbox_event import OutboxEvent
@@ -1,10 +1,36 @@
 import datetime as dt
+import os
 import uuid
 
 from pydantic import ConfigDict
 from sqlmodel import DateTime, Field, SQLModel
 
 
+def uuid7(timestamp: dt.datetime | None = None) -> uuid.UUID:
+    """Generate a time-ordered UUID version 7 (RFC 9562)
+
+    The first 48 bits are the Unix timestamp in milliseconds and the remaining 74 bits are random,
+    so new ids are appended at the end of the primary key index instead of splitting random pages.
+    """
+
+    timestamp = timestamp or dt.datetime.now(dt.UTC)
+    unix_ms = int(timestamp.timestamp() * 1000)
+    random_bits = int.from_bytes(os.urandom(10)) & ((1 << 74) - 1)
+
+    value = unix_ms << 80 | 0x7 << 76 | (random_bits >> 62) << 64 | 0b10 << 62 | (random_bits & ((1 << 62) - 1))
+    return uuid.UUID(int=value)
+
+
+def uuid7_timestamp(value: uuid.UUID) -> dt.datetime | None:
+    """Return the time a UUID version 7 was generated at, to the millisecond, None for other versions"""
+
+    if value.version != 7:  # noqa: PLR2004
+        return None
+
+    unix_ms = value.int >> 80
+    return dt.datetime.fromtimestamp(unix_ms // 1000, tz=dt.UTC) + dt.timedelta(milliseconds=unix_ms % 1000)
+
+
 class UuidModel(SQLModel):
     """Base model with created_at and id fields"""
 
@@ -27,7 +53,7 @@ class UuidModel(SQLModel):
 
     id: uuid.UUID = Field(
         primary_key=True,
-        default_factory=lambda: uuid.uuid4(),
+        default_factory=uuid7,
     )
 
     def __init__(self, **kwargs) -> None:
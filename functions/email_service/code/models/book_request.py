@@ -9,6 +9,5 @@ class BookRequest(BaseModel):
     id: UUID
     name: str
     email: EmailStr
-    presigned_url: str
     link: str
     message_id: str | None = None
@@ -0,0 +1,15 @@
+import json
+from code.api_handler import app, openapi_file
+
+from fastapi import FastAPI
+
+
+def generate() -> None:
+    """Write the OpenAPI schema of the API to a file served by the Lambda, run at image build time"""
+
+    schema = FastAPI.openapi(app)
+    openapi_file.write_text(json.dumps(schema))
+
+
+if __name__ == "__main__":
+    generate()
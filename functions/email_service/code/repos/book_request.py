@@ -1,11 +1,16 @@
 from code.environment import SERVICE_NAME
-from code.eventbridge import EventBridge
-from code.models import BookRequest
+from code.models import BookRequest, OutboxEvent
 from code.ses import Ses
+from functools import cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import jinja2
 from aws_lambda_powertools import Logger, Tracer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+if TYPE_CHECKING:
+    import jinja2
 
 
 tracer = Tracer(service=SERVICE_NAME)
@@ -14,14 +19,20 @@ logger = Logger(service=SERVICE_NAME)
 
 template = Path(__file__).parent.parent / "email" / "template.html"
 
-email_template = jinja2.Template(template.read_text())
+
+@cache
+def get_email_template() -> "jinja2.Template":
+    """Compile the email template on first use, so jinja2 stays off the cold start of other events"""
+    import jinja2
+
+    return jinja2.Template(template.read_text())
 
 
 class BookRequestRepo:
     """Email repository"""
 
-    def __init__(self, eventbridge: EventBridge, ses: Ses) -> None:
-        self.__eventbridge = eventbridge
+    def __init__(self, session: AsyncSession, ses: Ses) -> None:
+        self.__session = session
         self.__ses = ses
         self.__event_source = "emailService"
         self.__event_prefix = "ebookEmail"
@@ -30,7 +41,7 @@ class BookRequestRepo:
     async def send(self, book_request: BookRequest) -> None:
         """Generate a token, a pre-signed URL, and send an email to the reader"""
 
-        rendered_email = email_template.render(
+        rendered_email = get_email_template().render(
             name=book_request.name,
             file_link=book_request.link,
             email=book_request.email,
@@ -46,9 +57,11 @@ class BookRequestRepo:
 
         logger.info("Email sent", message_id=message_id)
 
-        await self.__eventbridge.put_event(
-            source=self.__event_source,
-            prefix=self.__event_prefix,
-            type="sent",
-            detail=book_request.model_dump_json(),
+        self.__session.add(
+            OutboxEvent(
+                source=self.__event_source,
+                detail_type=f"{self.__event_prefix}.sent",
+                detail=book_request.model_dump_json(),
+            ),
         )
+        await self.__session.commit()
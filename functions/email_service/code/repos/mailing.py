@@ -1,7 +1,6 @@
 import datetime as dt
 from code.environment import SERVICE_NAME
-from code.eventbridge import EventBridge
-from code.models import Mailing, MailingCreate
+from code.models import Mailing, MailingCreate, OutboxEvent
 
 from aws_lambda_powertools import Logger, Tracer
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -15,9 +14,8 @@ logger = Logger(service=SERVICE_NAME)
 class MailingRepo:
     """Mailing List repository"""
 
-    def __init__(self, session: AsyncSession, eventbridge: EventBridge) -> None:
+    def __init__(self, session: AsyncSession) -> None:
         self.__session = session
-        self.__eventbridge = eventbridge
         self.__event_source = "emailService"
         self.__event_prefix = "mailing"
 
@@ -38,14 +36,9 @@ class MailingRepo:
 
         logger.info("Creating new Mailing", Mailing=new.model_dump_json())
         self.__session.add(Mailing(**new.model_dump()))
+        self.__session.add(self.__outbox_event(type="created", detail=new.model_dump_json()))
 
         await self.__session.commit()
-        await self.__eventbridge.put_event(
-            source=self.__event_source,
-            prefix=self.__event_prefix,
-            type="created",
-            detail=new.model_dump_json(),
-        )
 
         return new
 
@@ -63,14 +56,10 @@ class MailingRepo:
         record.is_validated = True
         record.validated_at = dt.datetime.now(tz=dt.UTC)
 
+        self.__session.add(self.__outbox_event(type="validated", detail=record.model_dump_json()))
+
         await self.__session.commit()
         await self.__session.refresh(record)
-        await self.__eventbridge.put_event(
-            source=self.__event_source,
-            prefix=self.__event_prefix,
-            type="validated",
-            detail=record.model_dump_json(),
-        )
 
         return record
 
@@ -93,14 +82,10 @@ class MailingRepo:
         record.is_subscribed = False
         record.unsubscribed_at = dt.datetime.now(tz=dt.UTC)
 
+        self.__session.add(self.__outbox_event(type="unsubscribed", detail=record.model_dump_json()))
+
         await self.__session.commit()
         await self.__session.refresh(record)
-        await self.__eventbridge.put_event(
-            source=self.__event_source,
-            prefix=self.__event_prefix,
-            type="unsubscribed",
-            detail=record.model_dump_json(),
-        )
 
         return record
 
@@ -123,13 +108,17 @@ class MailingRepo:
         record.is_subscribed = True
         record.unsubscribed_at = None
 
+        self.__session.add(self.__outbox_event(type="resubscribed", detail=record.model_dump_json()))
+
         await self.__session.commit()
         await self.__session.refresh(record)
-        await self.__eventbridge.put_event(
-            source=self.__event_source,
-            prefix=self.__event_prefix,
-            type="resubscribed",
-            detail=record.model_dump_json(),
-        )
 
         return record
+
+    def __outbox_event(self, type: str, detail: str) -> OutboxEvent:
+        """Build the outbox event of a change, to be written in the same transaction"""
+        return OutboxEvent(
+            source=self.__event_source,
+            detail_type=f"{self.__event_prefix}.{type}",
+            detail=detail,
+        )
@@ -1,7 +1,7 @@
 from code.db import get_session
 from code.environment import SERVICE_NAME
-from code.eventbridge import EventBridge, get_eventbridge
 from code.repos.mailing import MailingRepo
+from code.timing import query_budget
 from typing import Annotated
 
 from aws_lambda_powertools import Logger, Tracer
@@ -21,25 +21,23 @@ tracer = Tracer(service=SERVICE_NAME)
 router = APIRouter()
 
 
-@router.post("/unsubscribe/{email}", status_code=status.HTTP_200_OK)
+@router.post("/unsubscribe/{email}", status_code=status.HTTP_200_OK, dependencies=[Depends(query_budget(4))])
 async def unsubscribe_from_mailing_list(
     session: Annotated[AsyncSession, Depends(get_session)],
-    eventbridge: Annotated[EventBridge, Depends(get_eventbridge)],
     email: Annotated[EmailStr, Path(description="Email to unsubscribe from mailing list")],
 ) -> None:
     """Unsubscribe from the mailing"""
 
-    repo = MailingRepo(session=session, eventbridge=eventbridge)
+    repo = MailingRepo(session=session)
     await repo.unsubscribe(email=email)
 
 
-@router.post("/resubscribe/{email}", status_code=status.HTTP_200_OK)
+@router.post("/resubscribe/{email}", status_code=status.HTTP_200_OK, dependencies=[Depends(query_budget(4))])
 async def resubscribe_to_mailing_list(
     session: Annotated[AsyncSession, Depends(get_session)],
-    eventbridge: Annotated[EventBridge, Depends(get_eventbridge)],
     email: Annotated[EmailStr, Path(description="Email to resubscribe to mailing list")],
 ) -> None:
     """Resubscribe to the mailing"""
 
-    repo = MailingRepo(session=session, eventbridge=eventbridge)
+    repo = MailingRepo(session=session)
     await repo.resubscribe(email=email)
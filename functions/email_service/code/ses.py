@@ -1,35 +1,27 @@
-from code.environment import LOCALSTACK_ENDPOINT, SERVICE_NAME
+from code.aws import get_client, run_in_executor
+from code.environment import SERVICE_NAME
+from code.timing import record
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
-from typing import cast
+from typing import TYPE_CHECKING, cast
 
-import boto3
 from aws_lambda_powertools import Logger
-from mypy_boto3_ses import SESClient
 
 
-logger = Logger(service=SERVICE_NAME)
+if TYPE_CHECKING:
+    from mypy_boto3_ses import SESClient
+
 
-session = boto3.Session()
+logger = Logger(service=SERVICE_NAME)
 
 
 class Ses:
     """Ses client."""
 
     def __init__(self) -> None:
-        """Initialize EventBridge.
-
-        If LOCALSTACK_ENDPOINT is not defined, the client will be initialized with the default endpoint (AWS account).
-        """
+        """Initialize Ses with the shared ses client."""
 
-        self.client = cast(
-            SESClient,
-            session.client(
-                service_name="ses",
-                endpoint_url=LOCALSTACK_ENDPOINT,
-            ),
-        )
-        logger.info("Ses initialized.")
+        self.client = cast("SESClient", get_client("ses"))
 
     async def send_email(self, to: str, subject: str, body: str) -> str:
         """Send an email using SES.
@@ -43,19 +35,21 @@ class Ses:
             str: the SES message ID
 
         """
-        response = self.client.send_email(
-            Source="ebook@real-life-iac.com",
-            Destination={"ToAddresses": [to]},
-            Message={
-                "Subject": {"Data": subject},
-                "Body": {
-                    "Html": {
-                        "Data": body,
+        with record("ses"):
+            response = await run_in_executor(
+                self.client.send_email,
+                Source="ebook@real-life-iac.com",
+                Destination={"ToAddresses": [to]},
+                Message={
+                    "Subject": {"Data": subject},
+                    "Body": {
+                        "Html": {
+                            "Data": body,
+                        },
                     },
                 },
-            },
-            ReplyToAddresses=["noreply@real-life-iac.com"],
-        )
+                ReplyToAddresses=["noreply@real-life-iac.com"],
+            )
 
         return response["MessageId"]
 
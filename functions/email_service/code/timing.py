@@ -0,0 +1,149 @@
+import time
+from code.environment import QUERY_BUDGET_STRICT, SERVER_TIMING_ENABLED, SERVICE_NAME
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from aws_lambda_powertools import Logger
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = Logger(service=SERVICE_NAME)
+
+
+class Timings:
+    """Time spent in each dependency during a request, in milliseconds, with the number of calls"""
+
+    def __init__(self) -> None:
+        self.durations: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.query_budget: int | None = None
+
+    def add(self, name: str, duration_ms: float) -> None:
+        """Add the duration of one call to a dependency"""
+        self.durations[name] = self.durations.get(name, 0.0) + duration_ms
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def header(self, total_ms: float) -> str:
+        """Format the timings as a Server-Timing header value"""
+        metrics = [f'{name};dur={duration:.1f};desc="{self.counts[name]} calls"' for name, duration in self.durations.items()]
+        metrics.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(metrics)
+
+    def log_fields(self) -> dict[str, float | int]:
+        """Format the timings as structured log fields, e.g. db_ms and db_calls"""
+        fields: dict[str, float | int] = {}
+        for name, duration in self.durations.items():
+            fields[f"{name}_ms"] = round(duration, 1)
+            fields[f"{name}_calls"] = self.counts[name]
+        return fields
+
+
+class QueryBudgetExceededError(Exception):
+    """Raised in strict mode when a request runs more SQL statements than its route's budget"""
+
+
+# The timings of the request being handled, None outside of a request
+current_timings: ContextVar[Timings | None] = ContextVar("current_timings", default=None)
+
+# Dependency name under which the SQL statements are counted
+QUERIES = "db"
+
+
+@contextmanager
+def record(name: str) -> Iterator[None]:
+    """Record the time spent in the block as a call to the dependency, if a request is being timed"""
+
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000)
+
+
+def query_budget(max_queries: int) -> Callable[[], Awaitable[None]]:
+    """Build a route dependency declaring the maximum number of SQL statements of a request
+
+    Exceeding the budget is logged, or raises QueryBudgetExceededError when QUERY_BUDGET_STRICT is set,
+    so the tests catch the changes adding round trips. Example:
+
+        @router.get("/statistics", dependencies=[Depends(query_budget(1))])
+    """
+
+    async def declare_query_budget() -> None:
+        if (timings := current_timings.get()) is not None:
+            timings.query_budget = max_queries
+
+    return declare_query_budget
+
+
+def check_query_budget(timings: Timings, method: str, path: str) -> None:
+    """Log or raise when the request ran more SQL statements than its budget"""
+
+    query_count = timings.counts.get(QUERIES, 0)
+    if timings.query_budget is None or query_count <= timings.query_budget:
+        return
+
+    if QUERY_BUDGET_STRICT:
+        msg = f"{method} {path} ran {query_count} SQL statements, over its budget of {timings.query_budget}"
+        raise QueryBudgetExceededError(msg)
+
+    logger.warning(
+        "Query budget exceeded",
+        method=method,
+        path=path,
+        query_count=query_count,
+        query_budget=timings.query_budget,
+    )
+
+
+class ServerTimingMiddleware:
+    """Time the requests and the dependencies they call, without a tracing backend
+
+    The timings are returned in a Server-Timing response header and logged as structured fields
+    on the "Request completed" log line. The SQL statements are checked against the route's query budget.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Run the request with its own timings"""
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = Timings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timings(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                check_query_budget(timings, method=scope["method"], path=scope["path"])
+                if SERVER_TIMING_ENABLED:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.header(total_ms=(time.perf_counter() - start) * 1000))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            current_timings.reset(token)
+            logger.info(
+                "Request completed",
+                method=scope["method"],
+                path=scope["path"],
+                status_code=status_code,
+                duration_ms=round((time.perf_counter() - start) * 1000, 1),
+                **timings.log_fields(),
+            )
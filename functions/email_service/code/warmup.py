@@ -0,0 +1,90 @@
+import asyncio
+import time
+from code.aws import get_client, get_session, run_in_executor
+from code.db import engine, get_db_secret, get_session_context
+from code.environment import SERVICE_NAME
+from code.models import Mailing
+from code.timing import Timings, current_timings, record
+from typing import Any
+
+from aws_lambda_powertools import Logger
+from sqlalchemy import text
+from sqlmodel import select
+
+
+logger = Logger(service=SERVICE_NAME)
+
+
+async def prime_aws_clients() -> None:
+    """Build the SES and EventBridge clients and resolve the credentials they sign with"""
+    with record("aws_clients"):
+        get_client("ses")
+        get_client("events")
+        await run_in_executor(get_session().get_credentials)
+
+
+async def prime_secrets() -> None:
+    """Fetch the DB credentials into their cache"""
+    with record("secrets"):
+        await run_in_executor(get_db_secret)
+
+
+async def prime_db() -> None:
+    """Open and validate a pooled connection, then run the hot statement once
+
+    SQLAlchemy and asyncpg then have the compiled and prepared lookup of a mailing by email cached,
+    which every route and event starts with. No email matches, so nothing is read or written.
+    """
+
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+    async with get_session_context() as session:
+        await session.execute(select(Mailing).where(Mailing.email == ""))
+
+
+async def prime() -> dict[str, Any]:
+    """Pay the first-use costs of the API and the event handler before an invocation does
+
+    A failed step is logged and the next ones still run.
+
+    Returns
+    -------
+        dict[str, Any]: the duration of each step in milliseconds, with the number of DB statements
+
+    """
+
+    timings = Timings()
+    token = current_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        for step in (prime_aws_clients, prime_secrets, prime_db):
+            try:
+                await step()
+            except Exception:
+                logger.exception("Priming step failed", step=step.__name__)
+    finally:
+        current_timings.reset(token)
+
+    return {"total_ms": round((time.perf_counter() - start) * 1000, 1), **timings.log_fields()}
+
+
+def warm_up(loop: asyncio.AbstractEventLoop | None = None) -> dict[str, Any] | None:
+    """Prime the execution environment on the event loop serving the invocations, logging how long it took
+
+    A failure is logged rather than raised: the invocations then pay the first-use costs themselves.
+
+    Args:
+    ----
+        loop (asyncio.AbstractEventLoop, optional): the loop of the handler, the current one by default
+
+    """
+
+    try:
+        durations = (loop or asyncio.get_event_loop()).run_until_complete(prime())
+    except Exception:
+        logger.exception("Priming failed")
+        return None
+
+    logger.info("Primed", **durations)
+    return durations
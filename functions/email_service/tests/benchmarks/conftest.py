@@ -0,0 +1,11 @@
+from code import db
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.fixture()
+def session(run):
+    session = AsyncSession(bind=db.engine, expire_on_commit=False)
+    yield session
+    run(session.close())
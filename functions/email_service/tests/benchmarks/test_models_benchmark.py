@@ -0,0 +1,58 @@
+import uuid
+from code.models import BookRequest, Mailing, MailingCreate
+
+import pytest
+
+
+PAYLOAD = {"email": "reader@example.com", "name": "Reader"}
+
+
+@pytest.fixture(scope="module")
+def mailing():
+    return Mailing(**PAYLOAD)
+
+
+@pytest.fixture(scope="module")
+def book_request():
+    return {**PAYLOAD, "id": str(uuid.uuid4()), "link": "https://example.com/download/token"}
+
+
+def test_mailing_construction(benchmark):
+    benchmark.group = "Mailing"
+
+    record = benchmark(lambda: Mailing(**PAYLOAD))
+
+    assert record.updated_at == record.created_at
+
+
+def test_mailing_create_validation(benchmark):
+    benchmark.group = "Mailing"
+
+    new = benchmark(MailingCreate.model_validate, PAYLOAD)
+
+    assert new.email == PAYLOAD["email"]
+
+
+def test_mailing_serialization(benchmark, mailing):
+    benchmark.group = "Mailing"
+
+    detail = benchmark(mailing.model_dump_json)
+
+    assert str(mailing.id) in detail
+
+
+def test_book_request_validation(benchmark, book_request):
+    benchmark.group = "BookRequest"
+
+    request = benchmark(BookRequest.model_validate, book_request)
+
+    assert str(request.id) == book_request["id"]
+
+
+def test_book_request_serialization(benchmark, book_request):
+    benchmark.group = "BookRequest"
+    request = BookRequest.model_validate(book_request)
+
+    detail = benchmark(request.model_dump_json)
+
+    assert request.link in detail
@@ -0,0 +1,44 @@
+import itertools
+from code.models import MailingCreate
+from code.repos.mailing import MailingRepo
+
+import pytest
+
+
+emails = (f"benchmark-{index}@example.com" for index in itertools.count())
+
+
+def new_mailing():
+    """A mailing for an email that isn't on the list yet"""
+    return MailingCreate(email=next(emails), name="Benchmark")
+
+
+@pytest.fixture()
+def repo(session):
+    return MailingRepo(session=session)
+
+
+def test_create(benchmark, run, repo):
+    benchmark.group = "MailingRepo"
+
+    record = benchmark(lambda: run(repo.create(new=new_mailing())))
+
+    assert record.email.startswith("benchmark-")
+
+
+def test_validate(benchmark, run, repo):
+    benchmark.group = "MailingRepo"
+    email = run(repo.create(new=new_mailing())).email
+
+    record = benchmark(lambda: run(repo.validate(email=email)))
+
+    assert record.is_validated
+
+
+def test_unsubscribe(benchmark, run, repo):
+    benchmark.group = "MailingRepo"
+    email = run(repo.create(new=new_mailing())).email
+
+    record = benchmark(lambda: run(repo.unsubscribe(email=email)))
+
+    assert not record.is_subscribed
@@ -0,0 +1,76 @@
+import asyncio
+from code import db
+from code.eventbridge import EventBridge
+
+import boto3
+import pytest
+from alembic import command
+from alembic.config import Config
+from moto.server import ThreadedMotoServer
+from pytest_postgresql import factories
+
+
+# Disposable server for the tests and benchmarks running against a database, see --postgresql-exec to point at the pg_ctl binary
+postgresql_proc = factories.postgresql_proc()
+
+
+@pytest.fixture(scope="session")
+def database(request):
+    """Start a disposable Postgres migrated to head, used by code.db as its local database
+
+    The tests and benchmarks using it are skipped when the PostgreSQL binaries aren't installed.
+    """
+
+    try:
+        proc = request.getfixturevalue("postgresql_proc")
+    except Exception as error:  # noqa: BLE001
+        pytest.skip(f"PostgreSQL is not available: {error}")
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(db, "is_local_db", True)
+        monkeypatch.setitem(db.LOCAL_DB_SECRET, "host", proc.host)
+        monkeypatch.setitem(db.LOCAL_DB_SECRET, "port", proc.port)
+        monkeypatch.setitem(db.LOCAL_DB_SECRET, "username", proc.user)
+        monkeypatch.setitem(db.LOCAL_DB_SECRET, "password", proc.password or None)
+
+        # The migrations look the current loop up, which the asyncio tests leave unset
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        command.upgrade(Config("alembic.ini"), "head")
+        yield proc
+
+
+@pytest.fixture(scope="session")
+def run(database):  # noqa: ARG001
+    """Run a coroutine to completion on the loop the pooled connections are bound to"""
+
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.run_until_complete(db.engine.dispose())
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def moto_endpoint():
+    """Start an in-process moto server for the AWS calls"""
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture()
+def eventbridge(moto_endpoint):
+    """EventBridge client putting the events to the moto server"""
+
+    client = boto3.client(
+        "events",
+        endpoint_url=moto_endpoint,
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    eventbridge = EventBridge()
+    eventbridge.client = client
+    return eventbridge
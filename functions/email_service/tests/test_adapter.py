@@ -0,0 +1,43 @@
+import importlib
+import json
+import sys
+from code import environment
+from pathlib import Path
+
+import pytest
+from mangum import Mangum
+
+
+EVENTS = sorted((Path(__file__).parent / "events").glob("http_api_*.json"))
+
+
+def load_api_handler(adapter):
+    """Import a fresh code.api_handler configured for the given adapter"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(environment, "API_ADAPTER", adapter)
+        sys.modules.pop("code.api_handler", None)
+        return importlib.import_module("code.api_handler")
+
+
+@pytest.fixture(scope="module")
+def handlers():
+    mangum = load_api_handler("mangum")
+    http_api = load_api_handler("http_api")
+    assert isinstance(mangum.asgi_handler, Mangum)
+    return mangum.asgi_handler, http_api.asgi_handler
+
+
+@pytest.mark.parametrize("event_file", EVENTS, ids=lambda path: path.stem)
+def test_http_api_adapter_matches_mangum(handlers, event_file):
+    mangum, http_api = handlers
+    event = json.loads(event_file.read_text())
+
+    expected = mangum(event, None)
+    response = http_api(event, None)
+
+    assert response["statusCode"] == expected["statusCode"]
+    assert json.loads(response["body"]) == json.loads(expected["body"])
+    assert response["headers"]["content-type"] == expected["headers"]["content-type"]
+    # The API Gateway sets the CORS headers
+    assert "access-control-allow-origin" in expected["headers"]
+    assert "access-control-allow-origin" not in response["headers"]
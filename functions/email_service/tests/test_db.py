@@ -0,0 +1,13 @@
+from code import db
+from code.environment import SERVICE_NAME
+
+from sqlalchemy import text
+
+
+def test_driver_options_reach_the_session(run):
+    async def show_settings():
+        async with db.get_session_context() as session:
+            settings = "current_setting('application_name'), current_setting('statement_timeout'), current_setting('jit')"
+            return (await session.execute(text(f"SELECT {settings}"))).one()
+
+    assert tuple(run(show_settings())) == (SERVICE_NAME, "0", "off")
@@ -0,0 +1,48 @@
+import uuid
+from code import db
+from code.event_handler import process
+from code.models import Mailing, OutboxEvent
+from code.ses import Ses
+
+import pytest
+from aws_lambda_powertools.utilities.data_classes import EventBridgeEvent
+from botocore.exceptions import ClientError
+from sqlalchemy import delete
+from sqlmodel import select
+
+
+def test_failed_send_creates_no_mailing(run, monkeypatch):
+    async def send_email(*_, **__):
+        raise ClientError({"Error": {"Code": "Throttling", "Message": "Maximum sending rate exceeded."}}, "SendEmail")
+
+    monkeypatch.setattr(Ses, "send_email", send_email)
+    event = EventBridgeEvent(
+        {
+            "detail-type": "book.requested",
+            "source": "downloadService",
+            "detail": {
+                "id": str(uuid.uuid4()),
+                "name": "Reader",
+                "email": "reader@example.com",
+                "link": "https://real-life-iac.com/download/token",
+            },
+        },
+    )
+
+    async def clear():
+        async with db.get_session_context() as session:
+            await session.execute(delete(Mailing))
+            await session.execute(delete(OutboxEvent))
+            await session.commit()
+
+    async def stored():
+        async with db.get_session_context() as session:
+            mailings = (await session.execute(select(Mailing.email))).all()
+            events = (await session.execute(select(OutboxEvent.detail_type))).all()
+            return mailings, events
+
+    run(clear())
+    with pytest.raises(ClientError):
+        run(process(event))
+
+    assert run(stored()) == ([], [])
@@ -0,0 +1,23 @@
+from code import db
+from code.models import OutboxEvent
+from code.repos.outbox import OutboxRepo
+
+from sqlalchemy import delete
+from sqlmodel import select
+
+
+def test_relay_publishes_the_mailing_events(run, eventbridge):
+    async def relay():
+        async with db.get_session_context() as session:
+            await session.execute(delete(OutboxEvent))
+            session.add(OutboxEvent(source="emailService", detail_type="mailing.created", detail='{"email": "reader@example.com"}'))
+            await session.commit()
+
+            relayed_count = await OutboxRepo(session=session, eventbridge=eventbridge).relay()
+            result = await session.execute(select(OutboxEvent.published_at))
+            return relayed_count, result.scalars().all()
+
+    relayed_count, published_at = run(relay())
+
+    assert relayed_count == 1
+    assert all(published_at)
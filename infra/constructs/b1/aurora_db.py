@@ -25,6 +25,7 @@ class B1AuroraDB(Construct):
         credentials (rds.Credentials): The credentials used to access the database
         bucket (s3.Bucket): The bucket used to migrate data into the database
         cluster (rds.DatabaseCluster): The database cluster
+        reader_endpoint (str | None): Hostname of the reader endpoint, None without reader instances
 
     """
 
@@ -192,6 +193,18 @@ class B1AuroraDB(Construct):
             string_value=self.cluster.cluster_endpoint.hostname,
         )
 
+        # Without reader instances the reader endpoint resolves to the writer, so it's not exposed
+        self.reader_endpoint = self.cluster.cluster_read_endpoint.hostname if num_reader_instances else None
+
+        if self.reader_endpoint:
+            ssm.StringParameter(
+                scope=self,
+                id="ClusterReaderEndpointParameter",
+                parameter_name=f"/{service_name}/storage/cluster/reader-endpoint",
+                description="API Database Cluster Reader Endpoint",
+                string_value=self.reader_endpoint,
+            )
+
         ssm.StringParameter(
             scope=self,
             id="ClusterResourceIdentifierParameter",
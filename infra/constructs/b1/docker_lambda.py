@@ -27,6 +27,8 @@ class B1DockerLambdaFunction(Construct):
     Attributes
     ----------
         function (_lambda.DockerImageFunction): The Lambda function
+        subscription_teams (list[str]): The teams subscribed to the alarms
+        service_name (str): The name of the service, also the namespace of its log metrics
 
 
     """
@@ -143,6 +145,9 @@ class B1DockerLambdaFunction(Construct):
             string_value=self.function.function_arn,
         )
 
+        self.subscription_teams = subscription_teams
+        self.service_name = service_name
+
         B1Alarm(
             scope=self,
             id="ErrorsAlarm",
@@ -181,3 +186,36 @@ class B1DockerLambdaFunction(Construct):
         cdk.CfnOutput(scope=self, id="FunctionNameOutput", value=self.function.function_name)
         cdk.CfnOutput(scope=self, id="FunctionRoleOutput", value=self.function.role.role_arn)
         cdk.Tags.of(self).add(key="service-name", value=service_name)
+
+    def add_log_message_alarm(self, id: str, message: str, alarm_description: str) -> B1Alarm:
+        """Alarm when the function logs a message, e.g. an error handled without failing the invocation
+
+        Args:
+        ----
+            id (str): Identifier of the alarm, its metric filter is suffixed with "Filter"
+            message (str): The message of the structured log lines to count
+            alarm_description (str): Description of the alarm
+
+        """
+
+        metric_filter = logs.MetricFilter(
+            scope=self,
+            id=f"{id}Filter",
+            log_group=self.function.log_group,
+            filter_pattern=logs.FilterPattern.string_value("$.message", "=", message),
+            metric_namespace=self.service_name,
+            metric_name=id,
+            metric_value="1",
+        )
+
+        return B1Alarm(
+            scope=self,
+            id=id,
+            subscription_teams=self.subscription_teams,
+            alarm_description=alarm_description,
+            metric=metric_filter.metric(period=cdk.Duration.minutes(5), statistic=cw.Stats.SUM),
+            threshold=0,
+            evaluation_periods=1,
+            comparison_operator=cw.ComparisonOperator.GREATER_THAN_THRESHOLD,
+            treat_missing_data=cw.TreatMissingData.NOT_BREACHING,
+        )
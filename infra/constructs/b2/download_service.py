@@ -1,6 +1,9 @@
+import aws_cdk as cdk
 from aws_cdk import (
     aws_ec2 as ec2,
     aws_events as events,
+    aws_events_targets as targets,
+    aws_secretsmanager as secretsmanager,
     aws_ssm as ssm,
 )
 from constructs import Construct
@@ -58,6 +61,15 @@ class B2DownloadService(Construct):
             service_name=f"{service_name}/bucket",
         )
 
+        # Key signing the download tokens, so the API rejects forged and expired links without a DB query
+        token_secret = secretsmanager.Secret(
+            scope=self,
+            id="TokenSigningKey",
+            secret_name=f"/{service_name}/api/token-signing-key",
+            description="Comma separated keys signing the download tokens, the first one signs",
+            generate_secret_string=secretsmanager.SecretStringGenerator(password_length=64, exclude_punctuation=True),
+        )
+
         # Lambda to handle API requests
         api_lambda = B1DockerLambdaFunction(
             scope=self,
@@ -78,13 +90,101 @@ class B2DownloadService(Construct):
                 "EBOOK_OBJECT_KEY": ebook_object_key,
                 "FRONTEND_URL": api_gateway.hosted_zone.zone_name,
                 "CORS_ORIGINS": ",".join(api_gateway.cors_options.allow_origins),
+                "TOKEN_SECRET_NAME": token_secret.secret_name,
+                "PRIME_ON_INIT": "true",
+                # Well under the API Gateway timeout, so a stuck query doesn't hold a pooled connection
+                "DB_STATEMENT_TIMEOUT_MS": "10000",
+                # The statistics are read from the reader, when the cluster has one
+                **({"DB_READER_HOST": aurora_db.reader_endpoint} if aurora_db.reader_endpoint else {}),
             },
         )
 
         aurora_db.security_group.add_ingress_rule(peer=self.security_group, connection=ec2.Port.tcp(5432))
 
         aurora_db.cluster.secret.grant_read(api_lambda.function)
+        token_secret.grant_read(api_lambda.function)
         bucket.grant_read(api_lambda.function, objects_key_pattern=ebook_object_key)
-        event_bus.grant_put_events_to(api_lambda.function)
 
         api_gateway.add_lambda_route(path="download", handler=api_lambda.function)
+
+        # Lambda to relay the outbox events to the event bus
+        relay_lambda = B1DockerLambdaFunction(
+            scope=self,
+            id="RelayLambda",
+            timeout_seconds=90,
+            memory_size=256,
+            directory="functions/download_service",
+            dockerfile="Dockerfile.lambda",
+            cmd=["code.relay_handler.handler"],
+            service_name=f"{service_name}/relay/lambda",
+            subscription_teams=subscription_teams,
+            vpc=vpc,
+            security_group=self.security_group,
+            environment_vars={
+                "EVENT_BUS_NAME": event_bus.event_bus_name,
+                "DB_SECRET_NAME": aurora_db.credentials.secret_name,
+                "OUTBOX_RELAY_SECONDS": "55",
+            },
+        )
+
+        aurora_db.cluster.secret.grant_read(relay_lambda.function)
+        event_bus.grant_put_events_to(relay_lambda.function)
+
+        # Each run polls the outbox for 55 seconds, so runs barely overlap
+        relay_rule = events.Rule(
+            scope=self,
+            id="RelaySchedule",
+            schedule=events.Schedule.rate(cdk.Duration.minutes(1)),
+        )
+        # The input tells the scheduled runs apart from the keep warm events
+        relay_rule.add_target(
+            targets.LambdaFunction(
+                handler=relay_lambda.function,
+                event=events.RuleTargetInput.from_object({"action": "relay"}),
+            ),
+        )
+
+        # The events out of publishing attempts are left in the outbox and only logged
+        relay_lambda.add_log_message_alarm(
+            id="OutboxDeadLettersAlarm",
+            message="Outbox event dead-lettered",
+            alarm_description="Outbox events were not published after all their attempts",
+        )
+
+        # Lambda function to create the upcoming downloads partitions, archive the expired downloads and drop their partitions
+        sweep_lambda = B1DockerLambdaFunction(
+            scope=self,
+            id="SweepLambda",
+            timeout_seconds=900,
+            memory_size=256,
+            directory="functions/download_service",
+            dockerfile="Dockerfile.lambda",
+            cmd=["code.sweep_handler.handler"],
+            service_name=f"{service_name}/sweep/lambda",
+            subscription_teams=subscription_teams,
+            vpc=vpc,
+            security_group=self.security_group,
+            environment_vars={
+                "DB_SECRET_NAME": aurora_db.credentials.secret_name,
+                "DOWNLOADS_PARTITIONS_AHEAD": "3",
+                "DOWNLOADS_RETENTION_DAYS": "365",
+                "BUCKET_NAME": bucket.bucket_name,
+                "ARCHIVE_PREFIX": "archive/downloads",
+            },
+        )
+
+        aurora_db.cluster.secret.grant_read(sweep_lambda.function)
+        bucket.grant_put(sweep_lambda.function, objects_key_pattern="archive/downloads/*")
+
+        # The input tells the daily run apart from the keep warm events
+        sweep_rule = events.Rule(
+            scope=self,
+            id="SweepSchedule",
+            schedule=events.Schedule.cron(minute="30", hour="3"),
+        )
+        sweep_rule.add_target(
+            targets.LambdaFunction(
+                handler=sweep_lambda.function,
+                event=events.RuleTargetInput.from_object({"action": "sweep"}),
+            ),
+        )
@@ -1,3 +1,4 @@
+import aws_cdk as cdk
 from aws_cdk import aws_ec2 as ec2, aws_events as events, aws_events_targets as targets, aws_iam as iam, aws_ssm as ssm
 from constructs import Construct
 
@@ -63,6 +64,7 @@ class B2EmailService(Construct):
                 "EVENT_BUS_NAME": event_bus.event_bus_name,
                 "DB_SECRET_NAME": aurora_db.credentials.secret_name,
                 "CORS_ORIGINS": ",".join(api_gateway.cors_options.allow_origins),
+                "PRIME_ON_INIT": "true",
             },
         )
 
@@ -108,11 +110,57 @@ class B2EmailService(Construct):
             environment_vars={
                 "EVENT_BUS_NAME": event_bus.event_bus_name,
                 "DB_SECRET_NAME": aurora_db.credentials.secret_name,
+                "PRIME_ON_INIT": "true",
+                # Well under the API Gateway timeout, so a stuck query doesn't hold a pooled connection
+                "DB_STATEMENT_TIMEOUT_MS": "10000",
             },
         )
 
         aurora_db.security_group.add_ingress_rule(peer=self.security_group, connection=ec2.Port.tcp(5432))
         aurora_db.cluster.secret.grant_read(api_lambda.function)
-        event_bus.grant_put_events_to(api_lambda.function)
 
         api_gateway.add_lambda_route(path="email", handler=api_lambda.function)
+
+        # Lambda function to relay the outbox events to the event bus
+        relay_lambda = B1DockerLambdaFunction(
+            scope=self,
+            id="RelayLambda",
+            timeout_seconds=90,
+            memory_size=256,
+            directory="functions/email_service",
+            dockerfile="Dockerfile.lambda",
+            cmd=["code.relay_handler.handler"],
+            service_name=f"{service_name}/relay/lambda",
+            subscription_teams=subscription_teams,
+            vpc=vpc,
+            security_group=self.security_group,
+            environment_vars={
+                "EVENT_BUS_NAME": event_bus.event_bus_name,
+                "DB_SECRET_NAME": aurora_db.credentials.secret_name,
+                "OUTBOX_RELAY_SECONDS": "55",
+            },
+        )
+
+        aurora_db.cluster.secret.grant_read(relay_lambda.function)
+        event_bus.grant_put_events_to(relay_lambda.function)
+
+        # Each run polls the outbox for 55 seconds, so runs barely overlap
+        relay_rule = events.Rule(
+            scope=self,
+            id="RelaySchedule",
+            schedule=events.Schedule.rate(cdk.Duration.minutes(1)),
+        )
+        # The input tells the scheduled runs apart from the keep warm events
+        relay_rule.add_target(
+            targets.LambdaFunction(
+                handler=relay_lambda.function,
+                event=events.RuleTargetInput.from_object({"action": "relay"}),
+            ),
+        )
+
+        # The events out of publishing attempts are left in the outbox and only logged
+        relay_lambda.add_log_message_alarm(
+            id="OutboxDeadLettersAlarm",
+            message="Outbox event dead-lettered",
+            alarm_description="Outbox events were not published after all their attempts",
+        )
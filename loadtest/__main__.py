@@ -0,0 +1,101 @@
+"""Run the load test scenarios against the stack of docker-compose.load.yaml
+
+Usage: python -m loadtest [--scenarios request_burst,redemption_burst] [--requests 500] [--concurrency 50]
+                          [--output report.json] [--baseline previous.json]
+
+The report is JSON: throughput, error count, status codes and p50/p95/p99 latencies per route and scenario.
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+
+from loadtest.aws import MotoStandIn
+from loadtest.report import Recorder, compare
+from loadtest.scenarios import SCENARIOS, LoadTest
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line arguments"""
+
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Load test the download and email services")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated scenarios, run in this order")
+    parser.add_argument("--requests", type=int, default=500, help="Number of download requests, redemptions and events")
+    parser.add_argument("--concurrency", type=int, default=50, help="Maximum number of requests in flight")
+    parser.add_argument("--duration", type=float, default=10, help="Duration of the statistics polling in seconds")
+    parser.add_argument("--download-url", default="http://localhost:5001")
+    parser.add_argument("--email-events-url", default="http://localhost:9002/2015-03-31/functions/function/invocations")
+    parser.add_argument("--moto-url", default="http://localhost:5000")
+    parser.add_argument("--output", type=Path, help="Write the report to this file instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="Report of a previous run to compare with")
+
+    args = parser.parse_args()
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}. Expected: {', '.join(SCENARIOS)}")
+
+    return args
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the scenarios and build the report"""
+
+    moto = MotoStandIn(endpoint_url=args.moto_url)
+    moto.bootstrap()
+
+    report: dict[str, Any] = {
+        "started_at": dt.datetime.now(dt.UTC).isoformat(),
+        "parameters": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+        },
+        "scenarios": {},
+    }
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+        test = LoadTest(
+            session=session,
+            moto=moto,
+            download_url=args.download_url,
+            email_events_url=args.email_events_url,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            duration_seconds=args.duration,
+        )
+        for name in args.scenarios.split(","):
+            recorder = Recorder()
+            await SCENARIOS[name](test, recorder)
+            recorder.finish()
+            report["scenarios"][name] = recorder.summary()
+            print(f"{name}: {json.dumps(report['scenarios'][name]['routes'])}", file=sys.stderr)  # noqa: T201
+
+    return report
+
+
+def main() -> None:
+    """Run the load test and write the report"""
+
+    args = parse_args()
+    report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)  # noqa: T201
+
+    if args.baseline:
+        for line in compare(json.loads(args.baseline.read_text()), report):
+            print(line, file=sys.stderr)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import time
+from typing import Any
+
+import boto3
+
+
+# Must match the defaults of the services
+BUCKET_NAME = "real-life-iac"
+EBOOK_OBJECT_KEY = "ebook.pdf"
+EVENT_BUS_NAME = "default"
+SENDER_EMAIL = "ebook@real-life-iac.com"
+QUEUE_NAME = "loadtest-download-events"
+
+
+class MotoStandIn:
+    """The AWS resources of the services on the moto server, and a queue capturing the download events"""
+
+    def __init__(self, endpoint_url: str) -> None:
+        # moto accepts any credentials
+        self.session = boto3.Session(aws_access_key_id="test", aws_secret_access_key="test", region_name="us-east-1")  # noqa: S106
+        self.endpoint_url = endpoint_url
+        self.queue_url: str | None = None
+
+    def client(self, service_name: str) -> Any:
+        """Get a client of the moto server"""
+        return self.session.client(service_name=service_name, endpoint_url=self.endpoint_url)
+
+    def bootstrap(self) -> None:
+        """Create the bucket with the ebook, verify the sender and route the download events to a queue
+
+        Idempotent, so it can run before every load test.
+        """
+
+        s3 = self.client("s3")
+        s3.create_bucket(Bucket=BUCKET_NAME)
+        s3.put_object(Bucket=BUCKET_NAME, Key=EBOOK_OBJECT_KEY, Body=b"%PDF-1.4 load test")
+
+        self.client("ses").verify_email_identity(EmailAddress=SENDER_EMAIL)
+
+        sqs = self.client("sqs")
+        self.queue_url = sqs.create_queue(QueueName=QUEUE_NAME)["QueueUrl"]
+        queue_arn = sqs.get_queue_attributes(QueueUrl=self.queue_url, AttributeNames=["QueueArn"])["Attributes"]["QueueArn"]
+
+        events = self.client("events")
+        events.put_rule(
+            Name=QUEUE_NAME,
+            EventBusName=EVENT_BUS_NAME,
+            EventPattern=json.dumps({"source": ["downloadService"], "detail-type": ["book.requested"]}),
+        )
+        events.put_targets(Rule=QUEUE_NAME, EventBusName=EVENT_BUS_NAME, Targets=[{"Id": "queue", "Arn": queue_arn}])
+
+    async def collect_events(self, count: int, timeout_seconds: float, email_prefix: str) -> list[dict[str, Any]]:
+        """Receive up to `count` book.requested events published by the relay, waiting at most `timeout_seconds`
+
+        Events of other runs left in the queue are dropped by the prefix of their email.
+        """
+
+        sqs = self.client("sqs")
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout_seconds
+        events: list[dict[str, Any]] = []
+
+        while len(events) < count and time.monotonic() < deadline:
+            response = await loop.run_in_executor(
+                None,
+                lambda: sqs.receive_message(QueueUrl=self.queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=1),
+            )
+            messages = response.get("Messages", [])
+            for message in messages:
+                event = json.loads(message["Body"])
+                if event["detail"]["email"].startswith(email_prefix):
+                    events.append(event)
+            if messages:
+                await loop.run_in_executor(
+                    None,
+                    lambda messages=messages: sqs.delete_message_batch(
+                        QueueUrl=self.queue_url,
+                        Entries=[{"Id": str(index), "ReceiptHandle": m["ReceiptHandle"]} for index, m in enumerate(messages)],
+                    ),
+                )
+
+        return events[:count]
@@ -0,0 +1,91 @@
+import math
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: list[float], rank: int) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not sorted_values:
+        return 0.0
+    index = max(math.ceil(rank / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+@dataclass
+class RouteStats:
+    """Latencies and outcomes of the calls to one route"""
+
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+    def summary(self, elapsed_seconds: float) -> dict[str, Any]:
+        """Summarize the calls: count, throughput, error count, status codes and latency percentiles in ms"""
+
+        latencies = sorted(self.latencies)
+        summary: dict[str, Any] = {
+            "count": len(latencies),
+            "errors": self.errors,
+            "throughput_rps": round(len(latencies) / elapsed_seconds, 2) if elapsed_seconds else 0.0,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+        }
+        for rank in PERCENTILES:
+            summary[f"p{rank}_ms"] = round(percentile(latencies, rank) * 1000, 2)
+        summary["max_ms"] = round(latencies[-1] * 1000, 2) if latencies else 0.0
+
+        return summary
+
+
+class Recorder:
+    """Record the calls of a scenario per route"""
+
+    def __init__(self) -> None:
+        self.routes: defaultdict[str, RouteStats] = defaultdict(RouteStats)
+        self.started_at = time.perf_counter()
+        self.finished_at: float | None = None
+
+    def record(self, route: str, status: int, seconds: float, is_error: bool = False) -> None:
+        """Record a call. Status 0 means the request failed before getting a response."""
+
+        stats = self.routes[route]
+        stats.latencies.append(seconds)
+        stats.statuses[status] += 1
+        if is_error or not 200 <= status < 400:  # noqa: PLR2004
+            stats.errors += 1
+
+    def finish(self) -> None:
+        """Stop the clock of the scenario"""
+        self.finished_at = time.perf_counter()
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize the scenario per route"""
+
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "routes": {route: stats.summary(elapsed) for route, stats in sorted(self.routes.items())},
+        }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """Describe the change of throughput and p95 latency per route between two reports"""
+
+    lines = []
+    for scenario, result in current["scenarios"].items():
+        baseline_routes = baseline.get("scenarios", {}).get(scenario, {}).get("routes", {})
+        for route, summary in result["routes"].items():
+            if route not in baseline_routes:
+                continue
+            before = baseline_routes[route]
+            lines.append(
+                f"{scenario} {route}: "
+                f"{before['throughput_rps']} -> {summary['throughput_rps']} rps, "
+                f"p95 {before['p95_ms']} -> {summary['p95_ms']} ms",
+            )
+
+    return lines
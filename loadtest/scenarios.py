@@ -0,0 +1,141 @@
+import asyncio
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+import aiohttp
+
+from loadtest.aws import MotoStandIn
+from loadtest.report import Recorder
+
+
+# How long the redemption burst waits for the relay to publish the requested downloads
+EVENTS_TIMEOUT_SECONDS = 60
+
+
+async def run_concurrently(concurrency: int, jobs: Iterable[Callable[[], Awaitable[Any]]]) -> None:
+    """Run the jobs with at most `concurrency` of them in flight"""
+
+    iterator = iter(jobs)
+
+    async def worker() -> None:
+        for job in iterator:
+            await job()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+@dataclass
+class LoadTest:
+    """Settings and shared state of a load test run"""
+
+    session: aiohttp.ClientSession
+    moto: MotoStandIn
+    download_url: str
+    email_events_url: str
+    requests: int
+    concurrency: int
+    duration_seconds: float
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    events: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def email_prefix(self) -> str:
+        """Prefix of the emails requested in this run"""
+        return f"load-{self.run_id}-"
+
+    async def call(
+        self,
+        recorder: Recorder,
+        route: str,
+        method: str,
+        url: str,
+        is_error: Callable[[bytes], bool] | None = None,
+        **kwargs: Any,
+    ) -> tuple[int, bytes]:
+        """Send a request and record its latency and status under the route"""
+
+        start = time.perf_counter()
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                body = await response.read()
+                status = response.status
+        except (aiohttp.ClientError, TimeoutError):
+            body, status = b"", 0
+        recorder.record(route, status, time.perf_counter() - start, is_error=bool(is_error and is_error(body)))
+
+        return status, body
+
+    async def requested_events(self) -> list[dict[str, Any]]:
+        """Get the book.requested events of this run, as published by the relay"""
+
+        if not self.events:
+            self.events = await self.moto.collect_events(
+                count=self.requests,
+                timeout_seconds=EVENTS_TIMEOUT_SECONDS,
+                email_prefix=self.email_prefix,
+            )
+        return self.events
+
+
+async def request_burst(test: LoadTest, recorder: Recorder) -> None:
+    """Request the book for `requests` distinct emails"""
+
+    def job(index: int) -> Callable[[], Awaitable[Any]]:
+        body = {"name": "Load Test", "email": f"{test.email_prefix}{index}@example.com"}
+        return lambda: test.call(recorder, "POST /download", "POST", f"{test.download_url}/download", json=body)
+
+    await run_concurrently(test.concurrency, (job(index) for index in range(test.requests)))
+
+
+async def redemption_burst(test: LoadTest, recorder: Recorder) -> None:
+    """Redeem the tokens of the requested downloads"""
+
+    tokens = [event["detail"]["link"].rsplit("/", 1)[-1] for event in await test.requested_events()]
+
+    def job(token: str) -> Callable[[], Awaitable[Any]]:
+        return lambda: test.call(recorder, "GET /download/{token}", "GET", f"{test.download_url}/download/{token}")
+
+    await run_concurrently(test.concurrency, (job(token) for token in tokens))
+
+
+async def statistics_polling(test: LoadTest, recorder: Recorder) -> None:
+    """Poll the statistics for `duration_seconds`"""
+
+    deadline = time.monotonic() + test.duration_seconds
+
+    def jobs() -> Iterable[Callable[[], Awaitable[Any]]]:
+        while time.monotonic() < deadline:
+            yield lambda: test.call(recorder, "GET /download/statistics", "GET", f"{test.download_url}/download/statistics")
+
+    await run_concurrently(test.concurrency, jobs())
+
+
+async def email_event_storm(test: LoadTest, recorder: Recorder) -> None:
+    """Invoke the email events handler with the book.requested events of the run
+
+    The runtime interface emulator runs one invocation at a time, like a single Lambda execution
+    environment, so the throughput is the one of a single instance.
+    """
+
+    def job(event: dict[str, Any]) -> Callable[[], Awaitable[Any]]:
+        return lambda: test.call(
+            recorder,
+            "invoke email event_handler",
+            "POST",
+            test.email_events_url,
+            is_error=lambda body: b'"errorType"' in body,
+            json=event,
+        )
+
+    await run_concurrently(test.concurrency, (job(event) for event in await test.requested_events()))
+
+
+SCENARIOS: dict[str, Callable[[LoadTest, Recorder], Awaitable[None]]] = {
+    "request_burst": request_burst,
+    "redemption_burst": redemption_burst,
+    "statistics_polling": statistics_polling,
+    "email_event_storm": email_event_storm,
+}